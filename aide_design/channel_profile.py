@@ -0,0 +1,125 @@
+"""
+Gradually varied water surface profiles in rectangular channels.
+
+The standard step method marches the energy equation from a control
+section, station by station:
+
+    E[i+1] = E[i] + Direction·((Sf[i] + Sf[i+1])/2 - Slope)·StationSpacing
+
+where E = y + V²/(2g) is the specific energy, Sf the friction slope from
+physchem.headloss_fric_rect and Slope the bed slope, positive downhill.
+Subcritical flow is controlled from downstream, so it is marched upstream
+(Direction = 1); supercritical flow is controlled from upstream and marched
+downstream (Direction = -1). Which one applies follows from comparing the
+control depth with physchem.height_water_critical.
+
+The depth at each new station is solved with solvers.bracketed_root on the
+branch of the energy equation that matches the flow regime, for all flows
+at once. Where that branch has no solution the flow passes through
+critical depth (a choke or a hydraulic jump) and the depth is set to
+critical depth.
+
+profile_rect_stations is a generator that yields one station at a time,
+so long channels never need their whole profile in memory; profile_rect
+collects the stations into arrays.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+from aide_design import solvers
+
+
+def _energy(FlowRate, Width, Depth):
+    """Return the specific energy of a rectangular channel flow."""
+    return Depth + (FlowRate / (Width * Depth))**2 / (2 * pk.GRAVITY)
+
+
+def _slope_fric(FlowRate, Width, Depth, Nu, PipeRough):
+    """Return the friction slope of a rectangular open channel."""
+    return pk.headloss_fric_rect(FlowRate, Width, Depth, 1, Nu, PipeRough,
+                                 True)
+
+
+def _next_depth(Depth, FlowRate, Width, Slope, StationSpacing, Nu,
+                PipeRough, Direction, DepthCritical):
+    """Return the depth one station away from Depth, away from the control."""
+    target = (_energy(FlowRate, Width, Depth)
+              + Direction * (_slope_fric(FlowRate, Width, Depth, Nu, PipeRough)
+                             / 2 - Slope) * StationSpacing)
+
+    def residual(y, target, FlowRate, Width, Nu, PipeRough, Direction):
+        return (_energy(FlowRate, Width, y)
+                - Direction * _slope_fric(FlowRate, Width, y, Nu, PipeRough)
+                * StationSpacing / 2
+                - target)
+
+    # Specific energy grows away from critical depth on both branches, so
+    # these bounds bracket the subcritical and supercritical roots.
+    subcritical = Direction > 0
+    Upper = (np.abs(target)
+             + _slope_fric(FlowRate, Width, DepthCritical, Nu, PipeRough)
+             * StationSpacing / 2 + DepthCritical)
+    Lower = np.where(subcritical, DepthCritical, DepthCritical * 1e-3)
+    Upper = np.where(subcritical, Upper, DepthCritical)
+    Depth, Iterations, converged = solvers.bracketed_root(
+        residual, Lower, Upper,
+        (target, FlowRate, Width, Nu, PipeRough, Direction), RTol=1e-12)
+    return np.where(converged, Depth, DepthCritical)
+
+
+def profile_rect_stations(FlowRate, Width, DepthControl, Slope,
+                          StationSpacing, NumStations, Nu, PipeRough):
+    """Yield the water depth at each station of a rectangular channel.
+
+    FlowRate, Width, DepthControl (the depth at the control section), Slope
+    (the bed slope, positive downhill), Nu and PipeRough may be arrays,
+    which are broadcast against each other to compute many profiles at
+    once. StationSpacing is the distance between stations. Inputs without
+    units are taken to be in SI units.
+
+    Yields NumStations+1 tuples of the distance from the control section
+    and the depths, starting with the control section itself. Distances are
+    measured upstream for subcritical flows and downstream for
+    supercritical flows.
+    """
+    FlowRate, Width, Depth, Slope, Nu, PipeRough = (
+        np.asarray(ut.magnitude_in(value, unit), dtype=float)
+        for value, unit in ((FlowRate, u.m**3/u.s), (Width, u.m),
+                            (DepthControl, u.m), (Slope, u.dimensionless),
+                            (Nu, u.m**2/u.s), (PipeRough, u.m)))
+    StationSpacing = ut.magnitude_in(StationSpacing, u.m)
+    ut.check_range([np.ravel(FlowRate), ">0", "Flow rate"],
+                   [np.ravel(Width), ">0", "Width"],
+                   [np.ravel(Depth), ">0", "Control depth"],
+                   [StationSpacing, ">0", "Station spacing"],
+                   [NumStations, ">=0, int", "NumStations"],
+                   [np.ravel(Nu), ">0", "Nu"],
+                   [np.ravel(PipeRough), "0-1", "Pipe roughness"])
+    FlowRate, Width, Depth, Slope, Nu, PipeRough = np.broadcast_arrays(
+        FlowRate, Width, Depth, Slope, Nu, PipeRough)
+    DepthCritical = pk.height_water_critical(FlowRate, Width)
+    Direction = np.where(Depth >= DepthCritical, 1., -1.)
+    Depth = Depth.copy()
+    yield 0 * u.m, Depth * u.m
+    for station in range(1, NumStations + 1):
+        Depth = _next_depth(Depth, FlowRate, Width, Slope, StationSpacing,
+                            Nu, PipeRough, Direction, DepthCritical)
+        yield station * StationSpacing * u.m, Depth * u.m
+
+
+def profile_rect(FlowRate, Width, DepthControl, Slope, StationSpacing,
+                 NumStations, Nu, PipeRough):
+    """Return the water surface profile of a rectangular channel.
+
+    Takes the same inputs as profile_rect_stations and returns the
+    distances of the stations from the control section and the depths,
+    with the stations along the first axis.
+    """
+    Distance, Depth = zip(*profile_rect_stations(
+        FlowRate, Width, DepthControl, Slope, StationSpacing, NumStations,
+        Nu, PipeRough))
+    return (np.array([d.magnitude for d in Distance]) * u.m,
+            np.stack([d.magnitude for d in Depth]) * u.m)
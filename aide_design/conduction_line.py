@@ -0,0 +1,141 @@
+"""
+Least cost design of gravity conduction lines.
+
+A conduction line carries water by gravity from a source down to a tank,
+over a profile of ground elevations. design_conduction_line splits the line
+into the segments between the profile's nodes and chooses a nominal
+diameter and SDR from pipedatabase for each segment. It picks the cheapest
+combination that keeps the pressure head at every node above a minimum and
+uses no pipe whose pressure rating is below the static pressure it sees.
+
+Trying every combination of pipes grows exponentially with the number of
+segments. Instead, dynamic programming works through the segments one after
+the other. At each node it keeps, for every band of HeadStep in the
+hydraulic grade line, only the cheapest design that reaches that band, so
+the work grows linearly with the number of segments. Each kept design
+carries its exact hydraulic grade line, so the pressure limits are checked
+exactly. Discarding the more expensive designs that reach the same band
+with a little more head can miss the optimum by a small margin, which
+shrinks with HeadStep.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import physchem_kernels as pk
+from aide_design import pipedatabase as pipe
+from aide_design import utility as ut
+
+STRESS_DESIGN_PVC = 2000 * u.psi
+"""The hydrostatic design stress of PVC pipe, which sets the pressure rating
+2·STRESS_DESIGN_PVC/(SDR - 1) of an SDR pipe."""
+
+
+def _pressure_rating(SDR, StressDesign):
+    """Return the pressure rating of SDR pipes as a head of water, in m."""
+    return (2 * StressDesign / (SDR-1)
+            / (exp.DENSITY_WATER.to(u.kg/u.m**3).magnitude * pk.GRAVITY))
+
+
+@u.wraps((u.inch, u.dimensionless, u.m, u.dollar),
+         [u.m**3/u.s, u.m, u.m, u.inch, u.dimensionless, u.dollar/u.m,
+          u.m**2/u.s, u.m, u.dimensionless, u.m, u.m, u.m, u.Pa], False)
+def design_conduction_line(FlowRate, Length, Elevation, ND, SDR,
+                           CostPerLength, Nu, PipeRough, KMinor=0,
+                           PressureHeadMin=0, PressureHeadEnd=0,
+                           HeadStep=0.1, StressDesign=STRESS_DESIGN_PVC):
+    """Return the least cost pipes for a gravity conduction line.
+
+    Length holds the lengths of the NumSegments segments of the line and
+    Elevation the NumSegments+1 elevations of their ends, starting with the
+    water level of the source. KMinor is the minor loss coefficient of each
+    segment, a scalar or one per segment.
+
+    ND, SDR and CostPerLength describe the pipes to choose from. They are
+    broadcast against each other, so that for example ND[:, np.newaxis]
+    with SDR = [26, 17] and a matching table of costs offers both SDRs in
+    every diameter. Costs may be given in any currency unit, such as dollar
+    or lempira per meter.
+
+    The pressure head at each node must be at least PressureHeadMin while
+    the line flows, and at least PressureHeadEnd at the end of the line.
+    The static pressure at both ends of a segment, with the line full and
+    not flowing, must not exceed the pressure rating of its pipe, which
+    follows from its SDR and StressDesign. HeadStep is the resolution of the
+    hydraulic grade line in the dynamic program.
+
+    Returns a tuple of the ND and SDR of each segment, the hydraulic grade
+    line at the nodes and the total cost, in dollars. Raises a ValueError if
+    none of the pipes can meet the limits.
+    """
+    Length = np.atleast_1d(np.asarray(Length, dtype=float))
+    Elevation = np.atleast_1d(np.asarray(Elevation, dtype=float))
+    NumSegments = Length.size
+    if Elevation.size != NumSegments + 1:
+        raise ValueError("Elevation needs one more value than Length.")
+    ND, SDR, CostPerLength = (a.reshape(-1) for a in np.broadcast_arrays(
+        np.asarray(ND, dtype=float), np.asarray(SDR, dtype=float),
+        np.asarray(CostPerLength, dtype=float)))
+    KMinor = np.broadcast_to(np.asarray(KMinor, dtype=float), (NumSegments,))
+    ut.check_range([FlowRate, ">0", "Flow rate"], [Length, ">0", "Length"],
+                   [SDR, ">0", "SDR"], [CostPerLength, ">=0", "Cost"],
+                   [Nu, ">0", "Nu"], [PipeRough, "0-1", "Pipe roughness"],
+                   [KMinor, ">=0", "K minor"], [HeadStep, ">0", "HeadStep"])
+    if np.any(SDR <= 2):
+        raise ValueError("SDR must be greater than 2.")
+    ID = np.array([pipe.ID_SDR(nd * u.inch, sdr).to(u.m).magnitude
+                   for nd, sdr in zip(ND, SDR)])
+    HeadSource = Elevation[0]
+
+    HeadLoss = pk.headloss(FlowRate, ID, Length[:, np.newaxis], Nu, PipeRough,
+                           KMinor[:, np.newaxis])
+    Cost = np.where(
+        _pressure_rating(SDR, StressDesign)
+        >= HeadSource - np.minimum(Elevation[:-1], Elevation[1:])[:, np.newaxis],
+        CostPerLength * Length[:, np.newaxis], np.inf)
+
+    # State j at a node holds the cheapest design found so far whose drop in
+    # the hydraulic grade line from HeadSource is between j and j+1 steps.
+    PressureHeadNode = np.full(NumSegments + 1, float(PressureHeadMin))
+    PressureHeadNode[-1] = max(PressureHeadMin, PressureHeadEnd)
+    DropMax = HeadSource - Elevation - PressureHeadNode
+    NumStates = int(max(DropMax.max(), 0) // HeadStep) + 1
+    States = np.arange(NumStates)
+    CostNode = np.full(NumStates, np.inf)
+    CostNode[0] = 0
+    Drop = np.zeros(NumStates)
+    Parent = np.empty((NumSegments, NumStates), dtype=np.intp)
+    Chosen = np.empty((NumSegments, NumStates), dtype=np.intp)
+    for i in range(NumSegments):
+        # Only pipes that lose less head than every cheaper pipe are useful.
+        Order = np.lexsort((HeadLoss[i], Cost[i]))
+        Order = Order[np.isfinite(Cost[i, Order])]
+        Useful = Order[HeadLoss[i, Order] < np.minimum.accumulate(
+            np.concatenate(([np.inf], HeadLoss[i, Order[:-1]])))]
+        Useful = np.tile(Useful, 2)
+        # A design in state j reaches state j + Steps or j + Steps + 1.
+        Steps = (HeadLoss[i, Useful] // HeadStep).astype(np.intp)
+        Steps[Steps.size // 2:] += 1
+        Previous = States - Steps[:, np.newaxis]
+        Previous = np.where(Previous >= 0, Previous, 0)
+        DropNew = Drop[Previous] + HeadLoss[i, Useful, np.newaxis]
+        Candidates = np.where(
+            (DropNew // HeadStep == States) & (DropNew <= DropMax[i + 1]),
+            CostNode[Previous] + Cost[i, Useful, np.newaxis], np.inf)
+        Best = np.argmin(Candidates, axis=0)
+        CostNode = Candidates[Best, States]
+        Drop = DropNew[Best, States]
+        Parent[i] = Previous[Best, States]
+        Chosen[i] = Useful[Best]
+    if not np.isfinite(CostNode).any():
+        raise ValueError("No choice of pipes meets the pressure limits.")
+
+    State = np.argmin(CostNode)
+    Pipe = np.empty(NumSegments, dtype=np.intp)
+    for i in range(NumSegments - 1, -1, -1):
+        Pipe[i] = Chosen[i, State]
+        State = Parent[i, State]
+    HeadGrade = HeadSource - np.concatenate(
+        ([0], np.cumsum(HeadLoss[np.arange(NumSegments), Pipe])))
+    return ND[Pipe], SDR[Pipe], HeadGrade, CostNode.min()
@@ -0,0 +1,144 @@
+"""
+Analytic derivatives of the physchem hydraulics kernels.
+
+Each function here returns the value of a physchem_kernels function together
+with its partial derivatives with respect to the flow and the geometry, as
+a tuple of arrays with the broadcast shape of the inputs. Like the kernels,
+they take and return plain magnitudes in SI units.
+
+The derivatives are hand-derived. The laminar friction factor is 64/Re.
+Swamee-Jain is differentiated directly. Colebrook-White is differentiated
+implicitly: with x = 1/√f and G(x, Re, ε') = x + 2·log10(ε' + 2.51x/Re) = 0,
+∂x/∂Re = -G_Re/G_x and ∂x/∂ε' = -G_ε'/G_x, where ε' = ε/(3.7·Diam) is the
+relative roughness term. The values are computed with the same expressions
+as the kernels, so they equal the kernel results exactly.
+
+The friction factor jumps at RE_TRANSITION_PIPE, and the derivatives are
+those of the branch each element is on.
+"""
+
+import numpy as np
+
+from aide_design import physchem_kernels as pk
+
+
+def _fric_partials(Re, RoughTerm, FricModel=pk.FRIC_MODEL_SWAMEE):
+    """Return the friction factor and its derivatives by Re and RoughTerm."""
+    pk._fric_turbulent(FricModel)
+    Re, RoughTerm = np.broadcast_arrays(np.asarray(Re, dtype=float),
+                                        np.asarray(RoughTerm, dtype=float))
+    f = np.empty(Re.shape)
+    dRe = np.empty(Re.shape)
+    dRough = np.zeros(Re.shape)
+    laminar = Re < pk.RE_TRANSITION_PIPE
+    f[laminar] = 64 / Re[laminar]
+    dRe[laminar] = -f[laminar] / Re[laminar]
+    turbulent = ~laminar
+    Re, RoughTerm = Re[turbulent], RoughTerm[turbulent]
+    if FricModel == pk.FRIC_MODEL_COLEBROOK:
+        fTurbulent = pk._fric_colebrook(Re, RoughTerm)
+        x = 1 / np.sqrt(fTurbulent)
+        c = 2 / np.log(10)
+        t = RoughTerm + 2.51 * x / Re
+        Gx = 1 + c * 2.51 / (Re * t)
+        # df/dx = -2f/x.
+        dfdx = -2 * fTurbulent / x
+        dRe[turbulent] = dfdx * c * 2.51 * x / (Re**2 * t * Gx)
+        dRough[turbulent] = -dfdx * c / (t * Gx)
+    else:
+        fTurbulent = pk._fric_swamee_jain(Re, RoughTerm)
+        s = RoughTerm + 5.74 / Re**0.9
+        dfds = -2 * fTurbulent / (np.log10(s) * s * np.log(10))
+        dRe[turbulent] = dfds * -0.9 * (s - RoughTerm) / Re
+        dRough[turbulent] = dfds
+    f[turbulent] = fTurbulent
+    return f[()], dRe[()], dRough[()]
+
+
+def fric_grad(FlowRate, Diam, Nu, PipeRough, FricModel=pk.FRIC_MODEL_SWAMEE):
+    """Return pk.fric and its derivatives by FlowRate and Diam."""
+    Re = pk.re_pipe(FlowRate, Diam, Nu)
+    RoughTerm = PipeRough / (3.7 * Diam)
+    f, dRe, dRough = _fric_partials(Re, RoughTerm, FricModel)
+    return (f, dRe * 4 / (np.pi * Diam * Nu),
+            -(dRe * Re + dRough * RoughTerm) / Diam)
+
+
+def headloss_grad(FlowRate, Diam, Length, Nu, PipeRough, KMinor,
+                  FricModel=pk.FRIC_MODEL_SWAMEE):
+    """Return pk.headloss and its derivatives by FlowRate, Diam and Length.
+
+    Returns the tuple (HeadLoss, ∂/∂FlowRate, ∂/∂Diam, ∂/∂Length).
+    """
+    f, fFlow, fDiam = fric_grad(FlowRate, Diam, Nu, PipeRough, FricModel)
+    k = 8 / (pk.GRAVITY * np.pi**2)
+    # The kernel's own order of operations, so the value matches bit for bit.
+    HeadLossFric = (f * 8 / (pk.GRAVITY * np.pi**2)
+                    * (Length * FlowRate**2) / Diam**5)
+    HeadLossExp = pk.headloss_exp(FlowRate, Diam, KMinor)
+    dLength = f * k * FlowRate**2 / Diam**5
+    dFlow = (fFlow * k * Length * FlowRate**2 / Diam**5
+             + 2 * f * k * Length * FlowRate / Diam**5
+             + 2 * KMinor * k * FlowRate / Diam**4)
+    dDiam = (fDiam * k * Length * FlowRate**2 / Diam**5
+             - (5 * HeadLossFric + 4 * HeadLossExp) / Diam)
+    return HeadLossFric + HeadLossExp, dFlow, dDiam, dLength
+
+
+def headloss_rect_grad(FlowRate, Width, DistCenter, Length, KMinor, Nu,
+                       PipeRough, openchannel):
+    """Return pk.headloss_rect and its derivatives.
+
+    Returns the tuple (HeadLoss, ∂/∂FlowRate, ∂/∂Width, ∂/∂DistCenter,
+    ∂/∂Length). openchannel may be an array, as in pk.radius_hydraulic.
+    """
+    Radius = pk.radius_hydraulic(Width, DistCenter, openchannel)
+    Area = Width * DistCenter
+    # The derivatives of the wetted perimeter by Width and DistCenter.
+    PerimWidth = np.where(openchannel, 1, 2)
+    Perim = Area / Radius
+    RadiusWidth = Radius * (1 / Width - PerimWidth / Perim)
+    RadiusDist = Radius * (1 / DistCenter - 2 / Perim)
+    Re = pk.re_rect(FlowRate, Width, DistCenter, Nu, openchannel)
+    RoughTerm = PipeRough / (3.7 * 4 * Radius)
+    f, dRe, dRough = _fric_partials(Re, RoughTerm)
+    fFlow = dRe * 4 * Radius / (Area * Nu)
+    fWidth = -(dRe * Re * PerimWidth / Perim
+               + dRough * RoughTerm * RadiusWidth / Radius)
+    fDist = -(dRe * Re * 2 / Perim + dRough * RoughTerm * RadiusDist / Radius)
+    HeadLossExp = pk.headloss_exp_rect(FlowRate, Width, DistCenter, KMinor)
+    HeadLossFric = (f * Length / (4 * Radius)
+                    * FlowRate**2 / (2 * pk.GRAVITY * Area**2))
+    # Head loss per unit friction factor.
+    Scale = Length / (4 * Radius) * FlowRate**2 / (2 * pk.GRAVITY * Area**2)
+    dFlow = (fFlow * Scale
+             + (f * Length / (4 * Radius) + KMinor)
+             * FlowRate / (pk.GRAVITY * Area**2))
+    dWidth = (fWidth * Scale
+              - HeadLossFric * (2 / Width + RadiusWidth / Radius)
+              - 2 * HeadLossExp / Width)
+    dDist = (fDist * Scale
+             - HeadLossFric * (2 / DistCenter + RadiusDist / Radius)
+             - 2 * HeadLossExp / DistCenter)
+    dLength = f / (4 * Radius) * FlowRate**2 / (2 * pk.GRAVITY * Area**2)
+    return HeadLossExp + HeadLossFric, dFlow, dWidth, dDist, dLength
+
+
+def flow_orifice_grad(Diam, Height, RatioVCOrifice):
+    """Return pk.flow_orifice and its derivatives by Diam and Height.
+
+    Returns the tuple (FlowRate, ∂/∂Diam, ∂/∂Height). Both derivatives are
+    zero wherever Height <= 0.
+    """
+    return (pk.flow_orifice(Diam, Height, RatioVCOrifice),
+            pk._select(Height > 0,
+                       lambda D, H, Ratio: (Ratio * np.pi / 2 * D
+                                            * np.sqrt(2 * pk.GRAVITY * H)),
+                       lambda D, H, Ratio: 0,
+                       Diam, Height, RatioVCOrifice),
+            pk._select(Height > 0,
+                       lambda D, H, Ratio: (Ratio * pk.area_circle(D)
+                                            * pk.GRAVITY
+                                            / np.sqrt(2 * pk.GRAVITY * H)),
+                       lambda D, H, Ratio: 0,
+                       Diam, Height, RatioVCOrifice))
@@ -0,0 +1,261 @@
+"""
+Hydraulic elements and series systems built on the physchem formulas.
+
+A hydraulic element, such as a Pipe, a RectChannel, an Orifice, a Weir or a
+SandBed, holds its geometry and computes its head loss at any flow rate.
+Its inputs are converted to SI once, when it is created, and so are the
+derived quantities that do not depend on the flow: the area, the hydraulic
+radius, the relative roughness and the constant factors of its head loss
+formula. Each parameter of an element is a single value. Elements are
+fixed once created, and use __slots__ to stay small.
+
+Elements in series are joined with Series, or with +. The head loss of a
+Series is the sum of the head losses of its elements. Series stacks the
+parameters of all its elements of the same kind into arrays once, so its
+head loss over an array of flows takes one broadcast evaluation per kind
+of element rather than a call per element and flow.
+
+The head losses follow physchem: Pipe is headloss, RectChannel is
+headloss_rect, Orifice is head_orifice, Weir is headloss_weir and SandBed
+is headloss_kozeny. They agree with those functions to rounding error.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import materials_database as mat
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+
+
+class Element:
+    """A part of a hydraulic system that loses head to the flow through it.
+
+    Subclasses list their numeric parameters and SI units in _params and
+    their other settings, which elements must share to be stacked, in
+    _options. They compute their derived quantities in _derive and their
+    head loss in SI units in _headloss.
+    """
+    __slots__ = ()
+    _params = ()
+    _options = ()
+
+    def _set(self, **values):
+        """Store the parameters in SI units and compute the derived values."""
+        for name, unit in self._params:
+            setattr(self, name,
+                    np.asarray(ut.magnitude_in(values[name], unit),
+                               dtype=float)[()])
+        for name in self._options:
+            setattr(self, name, values[name])
+        self._derive()
+
+    def _derive(self):
+        pass
+
+    @classmethod
+    def _stack(cls, elements):
+        """Return one element whose parameters are column arrays of elements'."""
+        stacked = cls.__new__(cls)
+        for name, _ in cls._params:
+            setattr(stacked, name,
+                    np.array([getattr(e, name) for e in elements])[:, np.newaxis])
+        for name in cls._options:
+            setattr(stacked, name, getattr(elements[0], name))
+        stacked._derive()
+        return stacked
+
+    def headloss(self, FlowRate, Nu=1e-6):
+        """Return the head loss at FlowRate for water of kinematic viscosity Nu.
+
+        FlowRate and Nu may be arrays, which are broadcast against each
+        other, with or without units. Plain numbers are taken to be in SI
+        units.
+        """
+        return self._headloss(
+            np.asarray(ut.magnitude_in(FlowRate, u.m**3/u.s), dtype=float),
+            ut.magnitude_in(Nu, u.m**2/u.s))[()] * u.m
+
+    def __add__(self, other):
+        return Series(self, other)
+
+
+class _Conduit(Element):
+    """An element with wall friction and minor losses.
+
+    Its head loss is (f·_FricFactor + _ExpFactor)·FlowRate², where the
+    friction factor f depends on Re = _ReFactor·FlowRate/Nu.
+    """
+    __slots__ = ('RoughTerm', '_ReFactor', '_FricFactor', '_ExpFactor')
+
+    def _headloss(self, FlowRate, Nu):
+        f = pk._fric_from_re(self._ReFactor * FlowRate / Nu, self.RoughTerm,
+                             self.FricModel)
+        return (f * self._FricFactor + self._ExpFactor) * FlowRate**2
+
+
+class Pipe(_Conduit):
+    """A straight pipe with major and minor losses, as in physchem.headloss."""
+    __slots__ = ('Diam', 'Length', 'PipeRough', 'KMinor', 'FricModel', 'Area')
+    _params = (('Diam', u.m), ('Length', u.m), ('PipeRough', u.m),
+               ('KMinor', u.dimensionless))
+    _options = ('FricModel',)
+
+    def __init__(self, Diam, Length, PipeRough=0, KMinor=0,
+                 FricModel=pk.FRIC_MODEL_SWAMEE):
+        pk._fric_turbulent(FricModel)
+        self._set(Diam=Diam, Length=Length, PipeRough=PipeRough,
+                  KMinor=KMinor, FricModel=FricModel)
+        ut.check_range([self.Diam, ">0", "Diameter"],
+                       [self.Length, ">=0", "Length"],
+                       [self.PipeRough, "0-1", "Pipe roughness"],
+                       [self.KMinor, ">=0", "K minor"])
+
+    def _derive(self):
+        self.Area = pk.area_circle(self.Diam)
+        self.RoughTerm = self.PipeRough / (3.7 * self.Diam)
+        self._ReFactor = 4 / (np.pi * self.Diam)
+        factor = 8 / (pk.GRAVITY * np.pi**2)
+        self._FricFactor = factor * self.Length / self.Diam**5
+        self._ExpFactor = factor * self.KMinor / self.Diam**4
+
+
+class RectChannel(_Conduit):
+    """A rectangular channel, as in physchem.headloss_rect.
+
+    DistCenter is the depth of the water. openchannel is True for a channel
+    open to the air and False for a closed conduit.
+    """
+    __slots__ = ('Width', 'DistCenter', 'Length', 'PipeRough', 'KMinor',
+                 'openchannel', 'FricModel', 'Area', 'RadiusHydraulic')
+    _params = (('Width', u.m), ('DistCenter', u.m), ('Length', u.m),
+               ('PipeRough', u.m), ('KMinor', u.dimensionless))
+    _options = ('openchannel', 'FricModel')
+
+    def __init__(self, Width, DistCenter, Length, PipeRough=0, KMinor=0,
+                 openchannel=True, FricModel=pk.FRIC_MODEL_SWAMEE):
+        pk._fric_turbulent(FricModel)
+        self._set(Width=Width, DistCenter=DistCenter, Length=Length,
+                  PipeRough=PipeRough, KMinor=KMinor, openchannel=openchannel,
+                  FricModel=FricModel)
+        ut.check_range([self.Width, ">0", "Width"],
+                       [self.DistCenter, ">0", "Distance to center"],
+                       [self.Length, ">=0", "Length"],
+                       [self.PipeRough, "0-1", "Pipe roughness"],
+                       [self.KMinor, ">=0", "K minor"])
+
+    def _derive(self):
+        self.Area = self.Width * self.DistCenter
+        self.RadiusHydraulic = pk.radius_hydraulic(self.Width, self.DistCenter,
+                                                   self.openchannel)
+        self.RoughTerm = self.PipeRough / (3.7 * 4 * self.RadiusHydraulic)
+        self._ReFactor = 4 * self.RadiusHydraulic / self.Area
+        factor = 1 / (2 * pk.GRAVITY * self.Area**2)
+        self._FricFactor = factor * self.Length / (4 * self.RadiusHydraulic)
+        self._ExpFactor = factor * self.KMinor
+
+
+class Orifice(Element):
+    """NumOrifices equal orifices in parallel, as in physchem.head_orifice."""
+    __slots__ = ('Diam', 'RatioVCOrifice', 'NumOrifices', 'Area',
+                 '_LossFactor')
+    _params = (('Diam', u.m), ('RatioVCOrifice', u.dimensionless),
+               ('NumOrifices', u.dimensionless))
+
+    def __init__(self, Diam, RatioVCOrifice=pk.RATIO_VC_ORIFICE,
+                 NumOrifices=1):
+        self._set(Diam=Diam, RatioVCOrifice=RatioVCOrifice,
+                  NumOrifices=NumOrifices)
+        ut.check_range([self.Diam, ">0", "Diameter"],
+                       [self.RatioVCOrifice, "0-1", "VC orifice ratio"],
+                       [self.NumOrifices, ">0", "Number of orifices"])
+
+    def _derive(self):
+        self.Area = pk.area_circle(self.Diam)
+        self._LossFactor = 1 / (2 * pk.GRAVITY
+                                * (self.RatioVCOrifice * self.Area
+                                   * self.NumOrifices)**2)
+
+    def _headloss(self, FlowRate, Nu):
+        return self._LossFactor * FlowRate**2
+
+
+class Weir(Element):
+    """A sharp-crested rectangular weir, as in physchem.headloss_weir."""
+    __slots__ = ('Width', '_LossFactor')
+    _params = (('Width', u.m),)
+
+    def __init__(self, Width):
+        self._set(Width=Width)
+        ut.check_range([self.Width, ">0", "Width"])
+
+    def _derive(self):
+        self._LossFactor = ((3/2) / (pk.RATIO_VC_ORIFICE * np.sqrt(2*pk.GRAVITY)
+                                     * self.Width)) ** (2/3)
+
+    def _headloss(self, FlowRate, Nu):
+        return self._LossFactor * FlowRate ** (2/3)
+
+
+class SandBed(Element):
+    """A fixed bed of uniform sand, as in physchem.headloss_kozeny.
+
+    Area is the plan area of the bed, which sets the approach velocity.
+    """
+    __slots__ = ('Depth', 'Area', 'DiamGrain', 'Porosity', '_LossFactor')
+    _params = (('Depth', u.m), ('Area', u.m**2), ('DiamGrain', u.m),
+               ('Porosity', u.dimensionless))
+
+    def __init__(self, Depth, Area, DiamGrain=mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE,
+                 Porosity=mat.POROSITY_FILTER_SAND):
+        self._set(Depth=Depth, Area=Area, DiamGrain=DiamGrain,
+                  Porosity=Porosity)
+        ut.check_range([self.Depth, ">0", "Depth"], [self.Area, ">0", "Area"],
+                       [self.DiamGrain, ">0", "Grain diameter"],
+                       [self.Porosity, "0-1", "Porosity"])
+
+    def _derive(self):
+        self._LossFactor = (pk.K_KOZENY * self.Depth * 36
+                            * (1 - self.Porosity)**2
+                            / (pk.GRAVITY * self.Porosity**3
+                               * self.DiamGrain**2 * self.Area))
+
+    def _headloss(self, FlowRate, Nu):
+        return self._LossFactor * Nu * FlowRate
+
+
+class Series(Element):
+    """Elements that the same flow passes through one after another.
+
+    Series may be nested; their elements are flattened into one list, in
+    order, in the elements attribute.
+    """
+    __slots__ = ('elements', '_groups')
+
+    def __init__(self, *elements):
+        flat = []
+        for element in elements:
+            if isinstance(element, Series):
+                flat.extend(element.elements)
+            elif isinstance(element, Element):
+                flat.append(element)
+            else:
+                raise TypeError("{0} is not a hydraulic element.".format(
+                    element))
+        self.elements = tuple(flat)
+        groups = {}
+        for element in flat:
+            key = (type(element),) + tuple(getattr(element, name)
+                                           for name in element._options)
+            groups.setdefault(key, []).append(element)
+        self._groups = [key[0]._stack(group) for key, group in groups.items()]
+
+    def _headloss(self, FlowRate, Nu):
+        # Each stacked group has one row per element and one column per flow.
+        FlowRate, Nu = np.broadcast_arrays(FlowRate, np.asarray(Nu, dtype=float))
+        shape = FlowRate.shape
+        FlowRate, Nu = FlowRate.reshape(-1), Nu.reshape(-1)
+        total = np.zeros(FlowRate.size)
+        for group in self._groups:
+            total += group._headloss(FlowRate, Nu).sum(axis=0)
+        return total.reshape(shape)
@@ -0,0 +1,260 @@
+"""
+Fused evaluation of composite physchem kernels.
+
+Composite kernels such as physchem_kernels.headloss_rect call other kernels
+that each recompute the hydraulic radius, the channel area and the squared
+flow rate, and every level allocates its own temporary arrays. fuse traces a
+kernel once with symbolic inputs, which records every arithmetic operation
+and numpy ufunc it applies as a node of an expression graph. Identical
+operations on identical operands share a single node, so each common
+subexpression is evaluated once. The graph is then turned into the source
+of one Python function that evaluates the nodes in order, deletes each
+temporary array after its last use and writes results into temporaries
+that are no longer needed instead of allocating new ones.
+
+Selections by physchem_kernels._select on a traced condition become a single
+node whose branches are fused separately, so each branch still only sees
+the elements that select it. Kernels that branch on their inputs in any
+other way, or that call numpy functions other than ufuncs, cannot be
+traced; fuse raises a ValueError for them.
+
+The fused function takes and returns plain magnitudes in the same SI units
+as the kernel, and returns the same values to the last bit on arrays of
+floats.
+"""
+
+import inspect
+
+import numpy as np
+
+from aide_design import physchem_kernels as pk
+
+_COMMUTATIVE = {np.add, np.multiply, np.maximum, np.minimum,
+                np.logical_and, np.logical_or}
+
+_NO_REUSE = {np.less, np.less_equal, np.greater, np.greater_equal, np.equal,
+             np.not_equal, np.logical_and, np.logical_or, np.logical_not,
+             np.isnan, np.isinf, np.isfinite, np.signbit}
+"""Ufuncs whose results are not floats and so cannot reuse a float buffer."""
+
+_POWER_SPECIAL = {2: np.square, 0.5: np.sqrt, -1: np.reciprocal}
+"""Powers that numpy evaluates with a faster ufunc.
+
+These match the fast paths that numpy takes for array ** scalar, so the
+fused result is identical to the kernel's.
+"""
+
+
+class _Node:
+    """A value in a traced expression graph."""
+
+    def __init__(self, trace, index, op, args, data=None):
+        self.trace = trace
+        self.index = index
+        self.op = op
+        self.args = args
+        self.data = data
+
+    def __array_ufunc__(self, ufunc, method, *inputs, **kwargs):
+        if method != '__call__' or kwargs:
+            return NotImplemented
+        return self.trace.apply(ufunc, inputs)
+
+    def __bool__(self):
+        raise TypeError("A traced value cannot decide a Python branch.")
+
+    def select(self, if_true, if_false, *args):
+        """Record a physchem_kernels._select on this condition."""
+        return self.trace.select(self, if_true, if_false, args)
+
+    __add__ = lambda self, other: np.add(self, other)
+    __radd__ = lambda self, other: np.add(other, self)
+    __sub__ = lambda self, other: np.subtract(self, other)
+    __rsub__ = lambda self, other: np.subtract(other, self)
+    __mul__ = lambda self, other: np.multiply(self, other)
+    __rmul__ = lambda self, other: np.multiply(other, self)
+    __truediv__ = lambda self, other: np.true_divide(self, other)
+    __rtruediv__ = lambda self, other: np.true_divide(other, self)
+    __pow__ = lambda self, other: np.power(self, other)
+    __rpow__ = lambda self, other: np.power(other, self)
+    __neg__ = lambda self: np.negative(self)
+    __abs__ = lambda self: np.absolute(self)
+    __lt__ = lambda self, other: np.less(self, other)
+    __le__ = lambda self, other: np.less_equal(self, other)
+    __gt__ = lambda self, other: np.greater(self, other)
+    __ge__ = lambda self, other: np.greater_equal(self, other)
+    __invert__ = lambda self: np.logical_not(self)
+
+
+def _key(arg):
+    """Return the hash-consing key of a node or constant argument."""
+    if isinstance(arg, _Node):
+        return ('node', arg.index)
+    if np.ndim(arg) != 0:
+        raise TypeError("Only scalar constants can be traced.")
+    return ('const', type(arg).__name__, repr(arg))
+
+
+class _Trace:
+    """An expression graph in which equal operations share one node."""
+
+    def __init__(self):
+        self.nodes = []
+        self.table = {}
+
+    def node(self, op, args, key, data=None):
+        if key not in self.table:
+            node = _Node(self, len(self.nodes), op, args, data)
+            self.nodes.append(node)
+            self.table[key] = node
+        return self.table[key]
+
+    def input(self, name):
+        return self.node('input', (), ('input', name), name)
+
+    def apply(self, ufunc, args):
+        if not any(isinstance(arg, _Node) for arg in args):
+            return ufunc(*args)
+        if (ufunc is np.power and not isinstance(args[1], _Node)
+                and args[1] in _POWER_SPECIAL):
+            ufunc, args = _POWER_SPECIAL[args[1]], args[:1]
+        keys = tuple(_key(arg) for arg in args)
+        if ufunc in _COMMUTATIVE:
+            keys = tuple(sorted(keys))
+        return self.node(ufunc, args, (ufunc.__name__,) + keys)
+
+    def select(self, condition, if_true, if_false, args):
+        branches = tuple(_compile(branch, ['a{0}'.format(i)
+                                           for i in range(len(args))], {})
+                         for branch in (if_true, if_false))
+        key = (('select', _key(condition))
+               + tuple(branch.key for branch in branches)
+               + tuple(_key(arg) for arg in args))
+        return self.node('select', (condition,) + tuple(args), key, branches)
+
+
+def _reuse(buffer, shape):
+    """Return buffer if a float result of the full shape can be written to it."""
+    if (type(buffer) is np.ndarray and buffer.shape == shape
+            and buffer.dtype == np.float64):
+        return buffer
+    return None
+
+
+def _generate(output, names, name):
+    """Return the source and namespace of a function evaluating output.
+
+    Also returns a key that is equal for functions that compute the same
+    thing, made of the source and the constants and branches it refers to.
+    """
+    # Visit the nodes the output depends on, in the order they were made.
+    needed, stack = set(), [output]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, _Node) and node.index not in needed:
+            needed.add(node.index)
+            stack.extend(node.args)
+    nodes = ([node for node in output.trace.nodes if node.index in needed]
+             if isinstance(output, _Node) else [])
+    lastUse = {}
+    for node in nodes:
+        for arg in node.args:
+            if isinstance(arg, _Node):
+                lastUse[arg.index] = node.index
+
+    namespace = {'np': np, '_reuse': _reuse, '_select': pk._select}
+    constants = {}
+    referenced = []
+
+    def operand(arg):
+        if isinstance(arg, _Node):
+            return variable[arg.index]
+        key = _key(arg)
+        if key not in constants:
+            constants[key] = 'c{0}'.format(len(constants))
+            namespace[constants[key]] = arg
+            referenced.append(key)
+        return constants[key]
+
+    variable = {}
+    lines = ['def {0}({1}):'.format(name, ', '.join(names)),
+             '    shape = np.broadcast_shapes({0})'.format(
+                 ', '.join('np.shape({0})'.format(n) for n in names))]
+    owned, temporaries = set(), set()
+    for node in nodes:
+        if node.op == 'input':
+            variable[node.index] = node.data
+            continue
+        target = variable[node.index] = 't{0}'.format(node.index)
+        operands = [operand(arg) for arg in node.args]
+        dying = [arg.index for arg in node.args if isinstance(arg, _Node)
+                 and arg.index in owned and lastUse[arg.index] == node.index]
+        if node.op == 'select':
+            for i, branch in enumerate(node.data):
+                namespace['{0}_{1}'.format(target, i)] = branch
+                referenced.append(branch.key)
+            lines.append('    {0} = _select({1}, {0}_0, {0}_1, {2})'.format(
+                target, operands[0], ', '.join(operands[1:])))
+        else:
+            # Selections may return their inputs, so only ufunc results
+            # are safe to overwrite.
+            function = '_' + node.op.__name__
+            namespace[function] = node.op
+            reusable = [i for i in dying if i in temporaries]
+            out = ''
+            if reusable and node.op not in _NO_REUSE:
+                out = ', out=_reuse({0}, shape)'.format(variable[reusable[0]])
+            lines.append('    {0} = {1}({2}{3})'.format(
+                target, function, ', '.join(operands), out))
+            temporaries.add(node.index)
+        owned.add(node.index)
+        for index in sorted(set(dying)):
+            if variable[index] != target:
+                lines.append('    del {0}'.format(variable[index]))
+    lines.append('    return {0}'.format(operand(output)))
+    source = '\n'.join(lines) + '\n'
+    return source, namespace, (source,) + tuple(referenced)
+
+
+def _compile(kernel, names, constants, name='fused'):
+    """Trace kernel(*names, **constants) and return the fused function."""
+    trace = _Trace()
+    try:
+        output = kernel(*(trace.input(n) for n in names), **constants)
+    except TypeError as error:
+        raise ValueError("{0} cannot be fused: {1}".format(
+            getattr(kernel, '__name__', kernel), error))
+    source, namespace, key = _generate(output, names, name)
+    exec(compile(source, '<fused {0}>'.format(name), 'exec'), namespace)
+    function = namespace[name]
+    function.source = source
+    function.key = key
+    return function
+
+
+def fuse(kernel, **constants):
+    """Return a fused version of a physchem_kernels function.
+
+    kernel is a function of physchem_kernels or its name. Keyword arguments
+    fix parameters of the kernel to scalar constants at compile time, which
+    lets branches on them, such as openchannel, be decided once. Parameters
+    with defaults, such as FricModel, keep their defaults unless they are
+    given. The fused function takes the remaining parameters, in order, as
+    numbers or numpy arrays in SI units. Its generated code is in its source
+    attribute.
+
+    Raises ValueError if the kernel cannot be traced.
+    """
+    if isinstance(kernel, str):
+        kernel = getattr(pk, kernel)
+    names = []
+    for name, parameter in inspect.signature(kernel).parameters.items():
+        if name in constants:
+            continue
+        if parameter.default is inspect.Parameter.empty:
+            names.append(name)
+        else:
+            constants[name] = parameter.default
+    function = _compile(kernel, names, constants, kernel.__name__)
+    function.__doc__ = kernel.__doc__
+    return function
@@ -0,0 +1,136 @@
+"""
+Hydraulic grade lines along surveyed gravity line profiles.
+
+A survey of a gravity line gives the distance along the line and the ground
+elevation at each of its points, often 10⁵ to 10⁶ points. hgl_profile_stream
+works through such a profile one chunk of points at a time, so memory use
+does not grow with the length of the profile. The chunks may come from any
+iterable of arrays, such as read_profile_csv, which reads a CSV file with
+pandas, or read_profile_npy, which slices a memory-mapped .npy file.
+
+Between neighbouring points the pipe loses head to friction
+(physchem.headloss_fric) over the length of pipe between them, and at each
+point it loses head to any fittings there (physchem.headloss_exp). The
+pressure head at each point is the hydraulic grade line less the elevation
+of the pipe, and points where it falls below a minimum or below zero are
+flagged with the ALERT_* codes.
+"""
+
+import numpy as np
+import pandas as pd
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+
+ALERT_NONE = 0
+
+ALERT_LOW_PRESSURE = 1
+
+ALERT_NEGATIVE_PRESSURE = 2
+"""Codes in the alert arrays returned by hgl_profile_stream."""
+
+
+def read_profile_csv(path, ChunkSize=100000, **kwargs):
+    """Yield the points of a profile stored in a CSV file, in chunks.
+
+    The columns of the file are the distance along the line, the elevation
+    and, optionally, the minor loss coefficient of the fittings at each
+    point. Further keyword arguments, such as usecols or header, are passed
+    on to pandas.read_csv. Yields arrays of up to ChunkSize rows.
+    """
+    for chunk in pd.read_csv(path, chunksize=ChunkSize, **kwargs):
+        yield chunk.to_numpy(dtype=float)
+
+
+def read_profile_npy(path, ChunkSize=100000):
+    """Yield the points of a profile stored in a .npy file, in chunks.
+
+    The file holds an array with a row for each point and the same columns
+    as for read_profile_csv. It is memory-mapped, so only the chunk being
+    worked on is read into memory.
+    """
+    profile = np.load(path, mmap_mode='r')
+    for start in range(0, len(profile), ChunkSize):
+        yield np.array(profile[start:start + ChunkSize], dtype=float)
+
+
+def hgl_profile_stream(Chunks, FlowRate, Diam, Nu, PipeRough, HeadSource=None,
+                       PressureHeadMin=0, LengthUnit=u.m):
+    """Yield the hydraulic grade line along a profile, one chunk at a time.
+
+    Chunks is an iterable of arrays with a row for each point of the profile
+    and columns holding the distance along the line, the elevation and,
+    optionally, the minor loss coefficient of the fittings at that point, in
+    LengthUnit. The distances are horizontal, as surveyed, and the length of
+    pipe between two points includes the rise or fall between them.
+    HeadSource is the hydraulic grade line at the first point, which
+    defaults to its elevation, as at the water level of a source tank.
+    HeadSource and PressureHeadMin given as plain numbers are in LengthUnit
+    too.
+
+    Yields, for each chunk, a tuple of the distances, the hydraulic grade
+    line and the pressure head at its points, and an array of alert codes:
+    ALERT_NEGATIVE_PRESSURE where the pressure head is below zero,
+    ALERT_LOW_PRESSURE where it is below PressureHeadMin and ALERT_NONE
+    elsewhere.
+    """
+    FlowRate, Diam, Nu, PipeRough = (
+        ut.magnitude_in(value, unit) for value, unit in (
+            (FlowRate, u.m**3/u.s), (Diam, u.m), (Nu, u.m**2/u.s),
+            (PipeRough, u.m)))
+    ut.check_range([FlowRate, ">0", "Flow rate"], [Diam, ">0", "Diameter"],
+                   [Nu, ">0", "Nu"], [PipeRough, "0-1", "Pipe roughness"])
+    scale = (1 * LengthUnit).to(u.m).magnitude
+    PressureHeadMin = ut.magnitude_in(PressureHeadMin, LengthUnit) * scale
+    SlopeFric = pk.headloss_fric(FlowRate, Diam, 1, Nu, PipeRough)
+    HeadExp = pk.headloss_exp(FlowRate, Diam, 1)
+    # The last point of the previous chunk and the grade line there.
+    last = None
+    for chunk in Chunks:
+        chunk = np.asarray(chunk, dtype=float)
+        if chunk.size == 0:
+            continue
+        Distance, Elevation = chunk[:, 0] * scale, chunk[:, 1] * scale
+        if last is None:
+            if HeadSource is None:
+                HeadGrade = Elevation[0]
+            else:
+                HeadGrade = ut.magnitude_in(HeadSource, LengthUnit) * scale
+            last = (Distance[0], Elevation[0])
+        Length = np.hypot(np.diff(Distance, prepend=last[0]),
+                          np.diff(Elevation, prepend=last[1]))
+        HeadLoss = SlopeFric * Length
+        if chunk.shape[1] > 2:
+            HeadLoss += HeadExp * chunk[:, 2]
+        HeadChunk = HeadGrade - np.cumsum(HeadLoss)
+        PressureHead = HeadChunk - Elevation
+        Alert = np.where(PressureHead < 0, ALERT_NEGATIVE_PRESSURE,
+                         np.where(PressureHead < PressureHeadMin,
+                                  ALERT_LOW_PRESSURE, ALERT_NONE)
+                         ).astype(np.int8)
+        HeadGrade, last = HeadChunk[-1], (Distance[-1], Elevation[-1])
+        yield Distance * u.m, HeadChunk * u.m, PressureHead * u.m, Alert
+
+
+def hgl_profile_summary(Chunks, FlowRate, Diam, Nu, PipeRough,
+                        HeadSource=None, PressureHeadMin=0, LengthUnit=u.m):
+    """Return the lowest pressure head along a profile and the alerts.
+
+    Takes the same inputs as hgl_profile_stream and returns a tuple of the
+    lowest pressure head, the distance at which it occurs, the number of
+    points with ALERT_LOW_PRESSURE and the number with
+    ALERT_NEGATIVE_PRESSURE.
+    """
+    PressureHeadLowest, DistanceLowest = np.inf, np.nan
+    NumLow = NumNegative = 0
+    for Distance, HeadGrade, PressureHead, Alert in hgl_profile_stream(
+            Chunks, FlowRate, Diam, Nu, PipeRough, HeadSource,
+            PressureHeadMin, LengthUnit):
+        lowest = np.argmin(PressureHead.magnitude)
+        if PressureHead.magnitude[lowest] < PressureHeadLowest:
+            PressureHeadLowest = PressureHead.magnitude[lowest]
+            DistanceLowest = Distance.magnitude[lowest]
+        NumLow += np.count_nonzero(Alert == ALERT_LOW_PRESSURE)
+        NumNegative += np.count_nonzero(Alert == ALERT_NEGATIVE_PRESSURE)
+    return PressureHeadLowest * u.m, DistanceLowest * u.m, NumLow, NumNegative
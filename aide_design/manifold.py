@@ -0,0 +1,143 @@
+"""
+Flow distribution among the ports of a manifold.
+
+physchem.headloss_manifold gives the total head loss of a manifold from the
+closed-form 1/3 + 1/(2N) + 1/(6N²) factor, assuming the flow leaves evenly.
+flow_manifold_ports instead solves for the flow through each port, so that
+the ratio of the smallest to the largest port flow can be compared with the
+design ratios in expert_inputs (RATIO_FLOW_SED_INLET,
+RATIO_FLOW_LAUNDER_ORIFICES).
+
+The ports are orifices (physchem.flow_orifice) spaced evenly along a pipe
+that is closed at its far end. Between neighbouring ports, the head across
+the ports changes by the friction loss in the pipe (physchem.headloss_fric)
+and by the change in the velocity head of the pipe flow:
+
+    h[i+1] - h[i] = PressureRecovery·(V[i]² - V[i+1]²)/(2g) - hf[i]
+
+In a dividing manifold (a sed inlet or filter manifold) the slowing pipe
+flow recovers pressure, PressureRecovery = 1. In a combining manifold (a
+sed launder) the entering flow must be accelerated, which costs about two
+velocity heads, PressureRecovery = -2.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+from aide_design import solvers
+
+PRESSURE_RECOVERY_DIVIDING = 1
+
+PRESSURE_RECOVERY_COMBINING = -2
+
+
+def _port_flows(HeadEnd, candidate, FlowRate, Diam, Spacing, NumPorts,
+                Nu, PipeRough, Coefficient, PressureRecovery, NumPortsMax):
+    """Return the port flows given the head across the last port.
+
+    The ports are marched from the closed end towards the connection. The
+    velocity head upstream of port i depends on the flow through port i,
+    so each step solves a quadratic for the square root of the head across
+    the port. Ports with no head pass no flow.
+    """
+    Diam, Spacing, NumPorts, Nu, PipeRough, Coefficient, PressureRecovery = (
+        a[candidate] for a in (Diam, Spacing, NumPorts, Nu, PipeRough,
+                               Coefficient, PressureRecovery))
+    Area = pk.area_circle(Diam)
+    a = PressureRecovery / (2 * pk.GRAVITY * Area**2)
+    PortFlow = np.zeros((len(candidate), NumPortsMax))
+    PipeFlow = np.zeros(len(candidate))
+    Head = HeadEnd
+    for i in range(NumPortsMax - 1, -1, -1):
+        hf = np.zeros(len(candidate))
+        wet = PipeFlow > 0
+        hf[wet] = pk.headloss_fric(PipeFlow[wet], Diam[wet], Spacing[wet],
+                                   Nu[wet], PipeRough[wet])
+        # (1 + a·c²)·s² + 2·a·P·c·s - (h + hf) = 0, with q = c·s
+        quadratic = 1 + a * Coefficient**2
+        linear = a * PipeFlow * Coefficient
+        constant = Head + hf
+        with np.errstate(invalid='ignore'):
+            root = ((np.sqrt(linear**2 + quadratic * constant) - linear)
+                    / quadratic)
+        root = np.where(constant > 0, np.nan_to_num(root), 0)
+        root = np.where(i == NumPorts - 1, np.sqrt(np.maximum(HeadEnd, 0)),
+                        root)
+        active = i < NumPorts
+        Head = np.where(active, root**2, HeadEnd)
+        PortFlow[:, i] = np.where(active, Coefficient * root, 0)
+        PipeFlow = PipeFlow + PortFlow[:, i]
+    return PortFlow
+
+
+@u.wraps((u.m**3/u.s, u.dimensionless),
+         [u.m**3/u.s, u.m, u.m, None, u.m, u.m**2/u.s, u.m, u.dimensionless,
+          u.dimensionless, None, None], False)
+def flow_manifold_ports(FlowRate, Diam, Length, NumPorts, DiamPort, Nu,
+                        PipeRough, RatioVCOrifice=pk.RATIO_VC_ORIFICE,
+                        PressureRecovery=PRESSURE_RECOVERY_DIVIDING,
+                        RTol=1e-12, MaxIter=100):
+    """Return the flow through each port of a manifold and the flow ratio.
+
+    FlowRate is the total flow through the manifold, Length the length of
+    the manifold along which the NumPorts ports are evenly spaced, and
+    DiamPort the diameter of the ports. All inputs may be arrays, which are
+    broadcast against each other to describe a batch of candidate
+    manifolds. Candidates with fewer ports than the largest NumPorts are
+    padded with ports of zero flow.
+
+    Returns a tuple of the port flows, with the ports along the last axis
+    starting next to the manifold's connection, and the ratio of the
+    smallest to the largest port flow of each candidate.
+
+    Given the head across the last port, the port flows follow by marching
+    towards the connection, and they all grow with that head. The head at
+    the last port is solved with solvers.bracketed_root, to RTol, so that
+    the port flows add up to FlowRate. Raises a RuntimeError for candidates
+    that do not converge.
+    """
+    inputs = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (
+            FlowRate, Diam, Length, NumPorts, DiamPort, Nu, PipeRough,
+            RatioVCOrifice, PressureRecovery)))
+    shape = inputs[0].shape
+    (FlowRate, Diam, Length, NumPorts, DiamPort, Nu, PipeRough,
+     RatioVCOrifice, PressureRecovery) = (a.reshape(-1) for a in inputs)
+    ut.check_range([FlowRate, ">0", "Flow rate"], [Diam, ">0", "Diameter"],
+                   [Length, ">0", "Length"], [NumPorts, ">0, int", "NumPorts"],
+                   [DiamPort, ">0", "Port diameter"], [Nu, ">0", "Nu"],
+                   [PipeRough, "0-1", "Pipe roughness"],
+                   [RatioVCOrifice, "0-1", "VC orifice ratio"])
+    NumPortsMax = int(NumPorts.max())
+    # Port flow per unit square root of head, as in physchem.flow_orifice.
+    Coefficient = (RatioVCOrifice * pk.area_circle(DiamPort)
+                   * np.sqrt(2 * pk.GRAVITY))
+    args = (FlowRate, Diam, Length / NumPorts, NumPorts, Nu, PipeRough,
+            Coefficient, PressureRecovery, NumPortsMax)
+
+    def excess_flow(HeadEnd, candidate):
+        return (np.sum(_port_flows(HeadEnd, candidate, *args), axis=-1)
+                - FlowRate[candidate])
+
+    # With no head at the last port no port has any flow. Double the upper
+    # bound, starting from an even split, until it carries too much flow.
+    candidates = np.arange(len(FlowRate))
+    Upper = (FlowRate / (NumPorts * Coefficient))**2
+    for _ in range(MaxIter):
+        short = excess_flow(Upper, candidates) <= 0
+        if not np.any(short):
+            break
+        Upper[short] *= 2
+    HeadEnd, Iterations, converged = solvers.bracketed_root(
+        excess_flow, 0, Upper, (candidates,), RTol, MaxIter)
+    if not np.all(converged):
+        raise RuntimeError("The manifold flows did not converge in {0} "
+                           "iterations.".format(MaxIter))
+    PortFlow = _port_flows(HeadEnd, candidates, *args)
+    ports = np.arange(NumPortsMax) < NumPorts[:, np.newaxis]
+    RatioFlow = (np.min(np.where(ports, PortFlow, np.inf), axis=-1)
+                 / np.max(PortFlow, axis=-1))
+    return (PortFlow.reshape(shape + (NumPortsMax,))[()],
+            RatioFlow.reshape(shape)[()])
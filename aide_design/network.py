@@ -0,0 +1,258 @@
+"""
+Steady flow in pipe networks with loops and branches.
+
+PipeNetwork solves for the flow in every pipe and the head at every node of
+a network with the global gradient algorithm (Todini and Pilati, 1988). The
+head loss in each pipe is physchem.headloss, major plus minor losses, so the
+results agree with the single pipe functions (except just above the
+laminar-turbulent transition, see PipeNetwork._headloss). The Newton system
+for the node heads is sparse, symmetric and positive definite, and it is
+solved with a sparse LU factorization.
+
+The network topology is fixed when a PipeNetwork is created: the fill
+reducing ordering of the node head matrix and the map from pipes to its
+nonzero entries are computed once, so each Newton iteration, and each later
+call to solve, only recomputes the numerical values. Repeated solves with
+new reservoir heads, demands or viscosities also start from the previous
+solution.
+"""
+
+import numpy as np
+from scipy import sparse
+from scipy.sparse import linalg
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+from aide_design import derivatives
+from aide_design import solvers
+
+_FLOW_MIN = 1e-12
+"""Smallest flow, in m³/s, used to evaluate the head loss derivative."""
+
+_TRANSITION_BAND = 1e-1
+"""Relative width of the flow band bridging the laminar-turbulent jump.
+
+Pipes with Reynolds numbers from 2100 to 2310 use the bridged head loss.
+"""
+
+
+class PipeNetwork:
+    """A network of pipes joining numbered nodes.
+
+    Pipe i runs from node StartNode[i] to node EndNode[i]; positive flows go
+    from the start node to the end node. Nodes are numbered from 0 to
+    NumNodes-1. The nodes in FixedNodes are reservoirs or tanks whose head
+    is given; the head at every other node is solved for. Every node should
+    be connected to at least one fixed head node.
+
+    Diam, Length, PipeRough and KMinor are given for each pipe (or as single
+    values for all of them), with or without units. Plain numbers are taken
+    to be in SI units.
+    """
+
+    def __init__(self, StartNode, EndNode, FixedNodes, Diam, Length,
+                 PipeRough, KMinor=0, NumNodes=None,
+                 FricModel=pk.FRIC_MODEL_SWAMEE):
+        StartNode = np.asarray(StartNode, dtype=int)
+        EndNode = np.asarray(EndNode, dtype=int)
+        self.NumNodes = (max(StartNode.max(), EndNode.max()) + 1
+                         if NumNodes is None else NumNodes)
+        self.NumPipes = len(StartNode)
+        self.FixedNodes = np.asarray(FixedNodes, dtype=int)
+        self.FricModel = FricModel
+        self.Diam, self.Length, self.PipeRough, self.KMinor = (
+            np.broadcast_to(np.asarray(ut.magnitude_in(value, unit),
+                                       dtype=float), (self.NumPipes,))
+            for value, unit in ((Diam, u.m), (Length, u.m),
+                                (PipeRough, u.m), (KMinor, u.dimensionless)))
+        ut.check_range([self.Diam, ">0", "Diameter"],
+                       [self.Length, ">0", "Length"],
+                       [self.PipeRough, "0-1", "Pipe roughness"],
+                       [self.KMinor, ">=0", "K minor"])
+
+        fixed = np.zeros(self.NumNodes, dtype=bool)
+        fixed[self.FixedNodes] = True
+        self.JunctionNodes = np.flatnonzero(~fixed)
+        self._number_junctions(StartNode, EndNode)
+        if len(self.JunctionNodes):
+            # Renumber the junctions in the fill reducing order of a first,
+            # symbolic factorization, so every later factorization can use
+            # the natural order.
+            order = self._factor(np.ones(self.NumPipes),
+                                 'MMD_AT_PLUS_A').perm_c
+            inverse = np.empty_like(order)
+            inverse[order] = np.arange(len(order))
+            self.JunctionNodes = self.JunctionNodes[inverse]
+            self._number_junctions(StartNode, EndNode)
+
+        # Incidence of the pipes on the fixed head nodes.
+        fixedIndex = np.full(self.NumNodes, -1)
+        fixedIndex[self.FixedNodes] = np.arange(len(self.FixedNodes))
+        self._incidenceFixed = self._incidence_matrix(
+            fixedIndex[StartNode], fixedIndex[EndNode], len(self.FixedNodes))
+        self._flow = None
+
+    def _number_junctions(self, StartNode, EndNode):
+        """Set up the junction incidence and node head matrix structure.
+
+        The junctions are numbered in the order of JunctionNodes.
+        """
+        n = len(self.JunctionNodes)
+        junction = np.full(self.NumNodes, -1)
+        junction[self.JunctionNodes] = np.arange(n)
+        s, e = junction[StartNode], junction[EndNode]
+        self._incidence = self._incidence_matrix(s, e, n)
+        # The node head matrix is the sum over pipes of g·a·aᵀ, where g is
+        # the pipe's conductance and a its column of the incidence matrix.
+        # Record where each term lands in the compressed matrix so that it
+        # can be assembled with one bincount.
+        termRow = np.concatenate([s, e, s, e])
+        termCol = np.concatenate([s, e, e, s])
+        termSign = np.repeat([1., 1., -1., -1.], self.NumPipes)
+        termPipe = np.tile(np.arange(self.NumPipes), 4)
+        keep = (termRow >= 0) & (termCol >= 0)
+        self._termSign, self._termPipe = termSign[keep], termPipe[keep]
+        keys, self._termSlot = np.unique(termRow[keep] * n + termCol[keep],
+                                         return_inverse=True)
+        self._indices = keys % n
+        self._indptr = np.searchsorted(keys // n, np.arange(n + 1))
+
+    def _factor(self, conductance, order='NATURAL'):
+        """Return the LU factorization of the node head matrix.
+
+        The matrix is symmetric, so its compressed rows are also its
+        compressed columns.
+        """
+        n = len(self.JunctionNodes)
+        matrix = sparse.csc_matrix(
+            (np.bincount(self._termSlot,
+                         self._termSign * conductance[self._termPipe],
+                         minlength=len(self._indices)),
+             self._indices, self._indptr), shape=(n, n))
+        return linalg.splu(matrix, permc_spec=order, diag_pivot_thresh=0,
+                           options=dict(SymmetricMode=True))
+
+    @staticmethod
+    def _incidence_matrix(start, end, numCols):
+        """Return the signed pipe-node incidence matrix.
+
+        Each pipe has -1 at its start node and +1 at its end node; nodes
+        numbered -1 are left out.
+        """
+        rows = np.arange(len(start))
+        hasStart, hasEnd = start >= 0, end >= 0
+        return sparse.csr_matrix(
+            (np.concatenate([-np.ones(hasStart.sum()), np.ones(hasEnd.sum())]),
+             (np.concatenate([rows[hasStart], rows[hasEnd]]),
+              np.concatenate([start[hasStart], end[hasEnd]]))),
+            shape=(len(start), numCols))
+
+    def _headloss(self, FlowRate, Nu):
+        """Return the signed head loss and its derivative for every pipe.
+
+        The derivative is the exact one from derivatives.headloss_grad,
+        including the change of the friction factor with the Reynolds
+        number, so the Newton steps converge quadratically away from the
+        laminar-turbulent transition.
+
+        The friction factor jumps from laminar to turbulent at
+        RE_TRANSITION_PIPE, and a pipe whose solution sits on that jump
+        would make the iteration cycle. Between the transition flow and
+        _TRANSITION_BAND above it, the head loss is therefore interpolated
+        linearly from the laminar to the turbulent value. This is the only
+        place where the head loss differs from physchem.headloss.
+        """
+        flow = np.maximum(np.abs(FlowRate), _FLOW_MIN)
+        headloss, derivative = derivatives.headloss_grad(
+            flow, self.Diam, self.Length, Nu, self.PipeRough, self.KMinor,
+            self.FricModel)[:2]
+        FlowLaminar = pk.flow_transition(self.Diam, Nu)
+        laminar = flow < FlowLaminar
+        FlowTurbulent = FlowLaminar * (1 + _TRANSITION_BAND)
+        band = ~laminar & (flow < FlowTurbulent)
+        if np.any(band):
+            args = (self.Diam[band], self.Length[band], Nu,
+                    self.PipeRough[band], self.KMinor[band], self.FricModel)
+            low = pk.headloss(FlowLaminar[band] * (1 - 1e-12), *args)
+            high = pk.headloss(FlowTurbulent[band], *args)
+            derivative[band] = ((high - low)
+                                / (FlowTurbulent[band] - FlowLaminar[band]))
+            headloss[band] = (low + (flow[band] - FlowLaminar[band])
+                              * derivative[band])
+        return np.sign(FlowRate) * headloss, derivative
+
+    def _step(self, FlowRate, dFlow, HeadImposed, Nu):
+        """Return the length of the Newton step along dFlow.
+
+        Once continuity holds, the flows minimize the network's energy, a
+        convex function of the flows whose slope along dFlow is the head
+        loss minus the imposed head, dotted with dFlow. The full step is
+        taken when the slope is still negative at its end. Otherwise the
+        step is cut back to where the slope is zero, which stops pipes near
+        the laminar-turbulent transition from overshooting back and forth.
+        """
+        def slope(step):
+            return np.array([np.dot(self._headloss(FlowRate + x * dFlow, Nu)[0]
+                                    + HeadImposed, dFlow) for x in step])
+
+        if slope([1])[0] <= 0:
+            return 1
+        step = solvers.bracketed_root(slope, 0, 1, RTol=1e-3)[0]
+        return step if step > 0 else 1
+
+    def solve(self, Head, Demand=0, Nu=1e-6, Tol=1e-8, MaxIter=100):
+        """Return the flow in every pipe and the head at every node.
+
+        Head gives the head at each of the FixedNodes, in order. Demand is
+        the flow drawn from each node (negative for inflows), either for all
+        NumNodes or as a single value; demands at fixed head nodes are
+        ignored. Nu is the kinematic viscosity of the water. Inputs without
+        units are taken to be in SI units.
+
+        The iteration stops when the sum of the flow changes is below Tol
+        times the sum of the flows. Returns the pipe flow rates, the node
+        heads and the number of iterations; raises a RuntimeError if the
+        network does not converge within MaxIter iterations.
+        """
+        HeadFixed = np.asarray(ut.magnitude_in(Head, u.m), dtype=float)
+        Demand = np.broadcast_to(
+            np.asarray(ut.magnitude_in(Demand, u.m**3/u.s), dtype=float),
+            (self.NumNodes,))[self.JunctionNodes]
+        Nu = ut.magnitude_in(Nu, u.m**2/u.s)
+        ut.check_range([Nu, ">0", "Nu"])
+        n = len(self.JunctionNodes)
+        if self._flow is None:
+            # Start from a velocity of 1 m/s in every pipe.
+            self._flow = pk.area_circle(self.Diam).copy()
+            self._head = np.full(n, HeadFixed.mean())
+        FlowRate, HeadJunction = self._flow.copy(), self._head.copy()
+        # Head differences imposed by the fixed head nodes on each pipe.
+        HeadImposed = self._incidenceFixed @ HeadFixed
+        for iteration in range(1, MaxIter + 1):
+            headloss, derivative = self._headloss(FlowRate, Nu)
+            conductance = 1 / derivative
+            residualPipe = (headloss + self._incidence @ HeadJunction
+                            + HeadImposed)
+            residualNode = self._incidence.T @ FlowRate - Demand
+            dHead = np.zeros(n)
+            if n:
+                dHead = self._factor(conductance).solve(
+                    residualNode
+                    - self._incidence.T @ (conductance * residualPipe))
+            dFlow = -conductance * (residualPipe + self._incidence @ dHead)
+            # The first step satisfies continuity; later steps keep it.
+            if iteration > 1:
+                dFlow *= self._step(FlowRate, dFlow, HeadImposed, Nu)
+            FlowRate += dFlow
+            HeadJunction += dHead
+            if np.sum(np.abs(dFlow)) <= Tol * np.sum(np.abs(FlowRate)):
+                break
+        else:
+            raise RuntimeError("The network did not converge in {0} "
+                               "iterations.".format(MaxIter))
+        self._flow, self._head = FlowRate, HeadJunction
+        HeadNode = np.empty(self.NumNodes)
+        HeadNode[self.FixedNodes] = HeadFixed
+        HeadNode[self.JunctionNodes] = HeadJunction
+        return FlowRate * u.m**3/u.s, HeadNode * u.m, iteration
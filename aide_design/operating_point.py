@@ -0,0 +1,118 @@
+"""
+Operating points of pumps and sources on pipe system curves.
+
+A pump delivers the flow at which its head, read from the supplier's
+tabulated pump curve, equals the head the system needs:
+
+    HeadPump(Q) = HeadStatic + physchem.headloss(Q, Diam, Length, Nu,
+                                                 PipeRough, KMinor)
+
+where KMinor is the sum of the minor loss coefficients of the fittings, such
+as the K_MINOR_* constants in expert_inputs. A source at a fixed elevation
+is a flat curve, HeadPump = [Head, Head] at FlowPump = [0, a flow larger
+than the source can deliver].
+
+flow_operating_point solves whole batches of pumps, pipe options and static
+heads in one call. The residual is first evaluated at every tabulated point
+of every combination, which finds the segment of each pump curve that holds
+the operating point. Along that segment the pump curve is linear, and the
+flow is then solved with solvers.bracketed_root.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+from aide_design import solvers
+
+
+def _head_system(FlowRate, HeadStatic, Diam, Length, Nu, PipeRough, KMinor,
+                 FricModel):
+    """Return the head the system needs to carry FlowRate, zero flow included."""
+    FlowRate, HeadStatic, Diam, Length, Nu, PipeRough, KMinor = (
+        np.broadcast_arrays(FlowRate, HeadStatic, Diam, Length, Nu, PipeRough,
+                            KMinor))
+    Head = np.array(HeadStatic, dtype=float)
+    wet = FlowRate > 0
+    Head[wet] += pk.headloss(FlowRate[wet], Diam[wet], Length[wet], Nu[wet],
+                             PipeRough[wet], KMinor[wet], FricModel)
+    return Head
+
+
+@u.wraps((u.m**3/u.s, u.m, None),
+         [u.m**3/u.s, u.m, u.m, u.m, u.m, u.m**2/u.s, u.m, u.dimensionless,
+          None, None, None], False)
+def flow_operating_point(FlowPump, HeadPump, HeadStatic, Diam, Length, Nu,
+                         PipeRough, KMinor=0,
+                         FricModel=pk.FRIC_MODEL_SWAMEE, RTol=1e-12,
+                         MaxIter=100):
+    """Return the flow and head at which pumps meet their system curves.
+
+    FlowPump and HeadPump tabulate the pump curves, with the points of each
+    curve along the last axis in order of increasing flow. The pump curves
+    are interpolated linearly between the points. Any leading axes of the
+    curves are broadcast against HeadStatic (the rise from the suction
+    water level to the delivery point), Diam, Length, Nu, PipeRough and
+    KMinor, so every combination of pump, pipe option and static head is
+    solved at once by giving each its own axis, for example pumps along the
+    first axis of the curves, Diam[:, np.newaxis] and HeadStatic.
+
+    Returns a tuple of the flow, the head and a mask of the combinations
+    with an operating point on the tabulated curve. Where the static head is
+    larger than the head of the pump at the first point, or the pump could
+    deliver more than the last point of its curve, there is no operating
+    point and the flow and head are nan. If a curve crosses the system curve
+    more than once, the crossing at the largest flow, which is the stable
+    one, is returned.
+    """
+    FlowPump, HeadPump = np.broadcast_arrays(
+        np.asarray(FlowPump, dtype=float), np.asarray(HeadPump, dtype=float))
+    if FlowPump.ndim == 0 or FlowPump.shape[-1] < 2:
+        raise ValueError("A pump curve needs at least two points.")
+    HeadStatic, Diam, Length, Nu, PipeRough, KMinor = (
+        np.asarray(a, dtype=float)
+        for a in (HeadStatic, Diam, Length, Nu, PipeRough, KMinor))
+    ut.check_range([np.ravel(FlowPump), ">=0", "Pump flow rate"],
+                   [np.ravel(Diam), ">0", "Diameter"],
+                   [np.ravel(Length), ">=0", "Length"],
+                   [np.ravel(Nu), ">0", "Nu"],
+                   [np.ravel(PipeRough), "0-1", "Pipe roughness"],
+                   [np.ravel(KMinor), ">=0", "K minor"])
+    if np.any(np.diff(FlowPump, axis=-1) <= 0):
+        raise ValueError("The flows of a pump curve must increase.")
+    shape = np.broadcast_shapes(FlowPump.shape[:-1], HeadStatic.shape,
+                                Diam.shape, Length.shape, Nu.shape,
+                                PipeRough.shape, KMinor.shape)
+    NumPoints = FlowPump.shape[-1]
+    FlowPump, HeadPump = (np.broadcast_to(a, shape + (NumPoints,))
+                          .reshape(-1, NumPoints)
+                          for a in (FlowPump, HeadPump))
+    system = tuple(np.broadcast_to(a, shape).reshape(-1, 1)
+                   for a in (HeadStatic, Diam, Length, Nu, PipeRough, KMinor))
+
+    # The pump has head to spare at the points left of its operating point.
+    spare = HeadPump >= _head_system(FlowPump, *system, FricModel)
+    last = NumPoints - 1 - np.argmax(spare[:, ::-1], axis=-1)
+    feasible = spare.any(axis=-1) & (last < NumPoints - 1)
+    rows = np.flatnonzero(feasible)
+    segment = last[rows]
+    Flow0, Flow1 = (FlowPump[rows, segment], FlowPump[rows, segment + 1])
+    Head0, Head1 = (HeadPump[rows, segment], HeadPump[rows, segment + 1])
+    system = tuple(a[rows, 0] for a in system)
+
+    def residual(FlowRate, Flow0, Flow1, Head0, Head1, *system):
+        HeadCurve = Head0 + (Head1-Head0) * (FlowRate-Flow0) / (Flow1-Flow0)
+        return HeadCurve - _head_system(FlowRate, *system, FricModel)
+
+    root, Iterations, converged = solvers.bracketed_root(
+        residual, Flow0, Flow1, (Flow0, Flow1, Head0, Head1, *system), RTol,
+        MaxIter)
+    FlowRate = np.full(feasible.size, np.nan)
+    Head = np.full(feasible.size, np.nan)
+    FlowRate[rows] = root
+    Head[rows[converged]] = _head_system(
+        root[converged], *(a[converged] for a in system), FricModel)
+    feasible[rows] = converged
+    return (FlowRate.reshape(shape)[()], Head.reshape(shape)[()],
+            feasible.reshape(shape)[()])
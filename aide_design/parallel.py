@@ -0,0 +1,207 @@
+"""
+Multithreaded and multiprocess evaluation of physchem formulas.
+
+numpy releases the GIL inside its ufunc loops, so a formula evaluated on
+separate slices of a large array in separate threads keeps several cores
+busy at once. evaluate splits the broadcast inputs of a function along
+their first axis into chunks of about THREAD_CHUNK elements, evaluates the
+chunks on a pool of threads and writes each result straight into the
+output array. threaded wraps a function so that every call goes through
+evaluate.
+
+Threading is off until it is turned on, either globally with set_threads
+or per call with the Threads argument. Inputs with fewer than MinSize
+elements are always evaluated directly in the calling thread, where the
+pool would cost more than it saves.
+
+The function must work element by element: each element of its result may
+only depend on the same element of its array inputs. That holds for the
+kernels in physchem_kernels and for the physchem and floc_model formulas,
+with or without units.
+
+map fans independent calls, such as whole design batches, out over a pool
+of processes. A Quantity only works with Quantities from its own unit
+registry, and every process has its own copy of units.unit_registry. So
+map sends Quantities between processes as a magnitude and a unit string,
+and rebuilds them against the unit_registry of the process that receives
+them.
+"""
+
+import functools
+import os
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+
+THREAD_CHUNK = 2**16
+"""Number of elements each task works on.
+
+Small enough that the temporaries of a formula stay in cache, large enough
+that the Python overhead of a task is negligible.
+"""
+
+_settings = {'Threads': 1, 'MinSize': 2**18}
+
+_pools = {}
+
+
+def set_threads(Threads=None, MinSize=None):
+    """Set the default number of threads and size threshold of evaluate.
+
+    Threads=None uses every core reported by os.cpu_count() and Threads=1
+    turns threading off. MinSize is the smallest number of elements that is
+    evaluated on the pool; None keeps the current threshold, which is 2**18
+    at import. Returns the previous (Threads, MinSize), so that the caller
+    can restore them.
+    """
+    previous = (_settings['Threads'], _settings['MinSize'])
+    _settings['Threads'] = Threads or os.cpu_count() or 1
+    if MinSize is not None:
+        _settings['MinSize'] = MinSize
+    return previous
+
+
+def _pool(Threads):
+    """Return the thread pool with Threads workers, made on first use."""
+    if Threads not in _pools:
+        _pools[Threads] = ThreadPoolExecutor(Threads)
+    return _pools[Threads]
+
+
+def _chunk(arg, shape, rows):
+    """Return the rows of arg that line up with rows of the broadcast shape.
+
+    Scalars and arrays that broadcast along the first axis are passed whole.
+    """
+    if np.ndim(arg) < len(shape) or np.shape(arg)[0] == 1:
+        return arg
+    return arg[rows]
+
+
+def _magnitude(value):
+    """Return the magnitude of a Quantity, or value itself."""
+    return value.magnitude if isinstance(value, u.Quantity) else value
+
+
+def evaluate(func, *args, Threads=None, MinSize=None, **kwargs):
+    """Return func(*args, **kwargs), evaluated on a pool of threads.
+
+    The positional arguments are broadcast against each other and split
+    along the first axis of their broadcast shape; numbers, strings and
+    other objects are passed to every chunk unchanged, and so are keyword
+    arguments. Array arguments may be numpy arrays or Quantities.
+
+    Threads and MinSize override the defaults set by set_threads for this
+    call. The result has the broadcast shape and the dtype and units of
+    func's own result. If func returns a tuple, each of its items is
+    assembled in the same way and a tuple is returned.
+    """
+    Threads = _settings['Threads'] if Threads is None else Threads
+    MinSize = _settings['MinSize'] if MinSize is None else MinSize
+    shape = np.broadcast_shapes(*(np.shape(arg) for arg in args
+                                  if np.ndim(arg) > 0))
+    size = int(np.prod(shape))
+    if Threads <= 1 or size < MinSize or len(shape) == 0:
+        return func(*args, **kwargs)
+    RowSize = size // shape[0]
+    step = max(1, THREAD_CHUNK // max(RowSize, 1))
+    chunks = [slice(start, start + step) for start in range(0, shape[0], step)]
+
+    def call(rows):
+        return func(*(_chunk(arg, shape, rows) for arg in args), **kwargs)
+
+    # The first chunk runs here to find out what func returns.
+    first = call(chunks[0])
+    isTuple = isinstance(first, tuple)
+    items = first if isTuple else (first,)
+    outs = [np.empty(shape, dtype=np.result_type(_magnitude(item)))
+            for item in items]
+
+    def store(rows, items):
+        for out, item in zip(outs, items):
+            out[rows] = _magnitude(item)
+
+    def task(rows):
+        result = call(rows)
+        store(rows, result if isTuple else (result,))
+
+    store(chunks[0], items)
+    # list() waits for every chunk and raises the first exception.
+    list(_pool(Threads).map(task, chunks[1:]))
+    results = tuple(u.Quantity(out, item.units)
+                    if isinstance(item, u.Quantity) else out
+                    for out, item in zip(outs, items))
+    return results if isTuple else results[0]
+
+
+def threaded(func, Threads=None, MinSize=None):
+    """Return a version of func whose calls go through evaluate.
+
+    Threads and MinSize are fixed for the returned function; None follows
+    the defaults set by set_threads at the time of each call.
+    """
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        return evaluate(func, *args, Threads=Threads, MinSize=MinSize,
+                        **kwargs)
+    return wrapper
+
+
+class _PackedQuantity:
+    """A Quantity in transit between processes."""
+    __slots__ = ('magnitude', 'unit')
+
+    def __init__(self, magnitude, unit):
+        self.magnitude = magnitude
+        self.unit = unit
+
+
+def _pack(value):
+    """Replace the Quantities in value, also inside containers, for pickling."""
+    if isinstance(value, u.Quantity):
+        return _PackedQuantity(value.magnitude, str(value.units))
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return type(value)(*(_pack(item) for item in value))
+    if isinstance(value, (tuple, list)):
+        return type(value)(_pack(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _pack(item) for key, item in value.items()}
+    return value
+
+
+def _unpack(value):
+    """Rebuild the Quantities packed by _pack in this process's registry."""
+    if isinstance(value, _PackedQuantity):
+        return u.Quantity(value.magnitude, value.unit)
+    if isinstance(value, tuple) and hasattr(value, '_fields'):
+        return type(value)(*(_unpack(item) for item in value))
+    if isinstance(value, (tuple, list)):
+        return type(value)(_unpack(item) for item in value)
+    if isinstance(value, dict):
+        return {key: _unpack(item) for key, item in value.items()}
+    return value
+
+
+def _run(func, kwargs, args):
+    """Call func in a worker process with unpacked arguments."""
+    return _pack(func(*_unpack(args), **_unpack(kwargs)))
+
+
+def map(func, *iterables, Processes=None, ChunkSize=1, **kwargs):
+    """Return [func(*args, **kwargs) for args in zip(*iterables)], in parallel.
+
+    The calls run on a pool of Processes worker processes, all cores by
+    default. Arguments and results may be Quantities, also inside tuples,
+    lists and dicts; they arrive in each process bound to its own
+    unit_registry. func and every other argument must be picklable, so func
+    should be defined at the top level of a module. ChunkSize calls are
+    sent to a worker at a time, which helps when the calls are short.
+    Keyword arguments are passed to every call.
+    """
+    tasks = [_pack(args) for args in zip(*iterables)]
+    with ProcessPoolExecutor(Processes) as pool:
+        results = pool.map(functools.partial(_run, func, _pack(kwargs)),
+                           tasks, chunksize=ChunkSize)
+        return [_unpack(result) for result in results]
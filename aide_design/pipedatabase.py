@@ -11,6 +11,8 @@ By: Sage Weber-Shirk
 #Let's begin to create the pipe database
 # https://docs.python.org/2/library/csv.html
 from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
 import numpy as np
 # We will use Pandas
 import pandas as pd
@@ -114,3 +116,46 @@ def ND_available(NDguess):
     """
     myindex = (ND_all_available() >= NDguess)
     return min(ND_all_available()[myindex])
+
+
+def _ID_SDR_available_m(SDR):
+    """Return the inner diameters, in meters, of the available SDR pipes."""
+    used = pipedb['Used'] == 1
+    return (np.array(pipedb['ODinch'][used]) * (SDR-2) / SDR
+            * (1 * u.inch).to(u.m).magnitude)
+
+
+@u.wraps(u.inch, [u.m**3/u.s, u.m, u.m, u.m**2/u.s, u.m, u.dimensionless,
+                  u.dimensionless, None], False)
+def ND_SDR_headloss(FlowRate, HeadLoss, Length, Nu, PipeRough, KMinor, SDR,
+                    FricModel=pk.FRIC_MODEL_SWAMEE):
+    """Return the smallest available ND whose head loss is within HeadLoss.
+
+    FlowRate, HeadLoss, Length and KMinor may be arrays, which are broadcast
+    against each other so that many pipes are sized at once. The total head
+    loss (physchem.headloss) of every case is evaluated for every available
+    SDR pipe together, and the smallest ND that does not exceed the head
+    loss budget is returned for each case. Cases that no available pipe can
+    carry within the budget return nan.
+
+    This sizes against the actual catalog instead of solving diam_pipe for
+    a continuous diameter and rounding up with ND_SDR_available.
+    """
+    ut.check_range([np.ravel(FlowRate), ">0", "Flow rate"],
+                   [np.ravel(Length), ">0", "Length"],
+                   [np.ravel(HeadLoss), ">0", "Headloss"], [Nu, ">0", "Nu"],
+                   [PipeRough, "0-1", "Pipe roughness"],
+                   [np.ravel(KMinor), ">=0", "K minor"], [SDR, ">0", "SDR"])
+    ID = _ID_SDR_available_m(SDR)
+    FlowRate, HeadLoss, Length, KMinor = np.broadcast_arrays(
+        *(np.asarray(a, dtype=float) for a in (FlowRate, HeadLoss, Length,
+                                               KMinor)))
+    # Head loss falls as the diameter grows, so the first feasible pipe in
+    # the catalog is the smallest.
+    feasible = (pk.headloss(FlowRate[..., np.newaxis], ID,
+                            Length[..., np.newaxis], Nu, PipeRough,
+                            KMinor[..., np.newaxis], FricModel)
+                <= HeadLoss[..., np.newaxis])
+    ND = np.array(pipedb['NDinch'][pipedb['Used'] == 1])
+    return np.where(feasible.any(axis=-1), ND[feasible.argmax(axis=-1)],
+                    np.nan)[()]
@@ -0,0 +1,357 @@
+"""
+Expansion of filter sand beds during backwash.
+
+physchem.headloss_kozeny gives the head loss through a fixed bed of uniform
+sand. Filter sand is graded, though, so during backwash the fine grains
+fluidize and expand long before the coarse grains do. expansion_sand_bed
+splits the sand into NumFractions fractions of equal mass, each with its
+own grain diameter, from a lognormal grain size distribution through the
+effective size (d10) and the uniformity coefficient (d60/d10).
+
+A fraction fluidizes when the head loss through it, per unit volume of
+sand, reaches the buoyant weight of the sand, which sets its porosity ε:
+
+    36·K_KOZENY·Nu·Vel·(1-ε)/(g·ε³·Diam²) + ERGUN_INERTIAL·Vel²/(g·ε³·Diam)
+        = DensitySand/DensityWater - 1
+
+The first term is the Carman-Kozeny head loss of physchem.headloss_kozeny
+and the second is the inertial term of the Ergun equation, both divided by
+the sand's volume fraction 1-ε. The left side falls as ε grows, so each
+fraction has one porosity, found for every fraction, velocity and
+temperature at once with solvers.bracketed_root. Fractions whose porosity
+would be below that of the fixed bed stay fixed.
+
+During a filter run the sand captures particles and its head loss grows.
+filter_headloss_stream follows the head loss of the parallel layers of
+stacked rapid sand filters through a time series of influent turbidity,
+backwashing each filter when it reaches HEADLOSS_FILTER_DIRTY. Each layer
+is split into NumSlices slices. The share of the particles entering a layer
+that each slice captures falls off exponentially with depth, at the filter
+coefficient, and the captured solids fill the pores of the slice, which
+raises its Carman-Kozeny head loss. The flow divides between the layers so
+that they all lose the same head.
+
+The state of a filter only depends on the mass of solids that has entered
+it since the last backwash, not on when it entered. So the head loss is
+computed once as a function of that load, by integrating the deposits over
+the load, and the turbidity series is then reduced to a running sum of the
+load, which makes long series at short time steps cheap.
+"""
+
+import itertools
+
+import numpy as np
+from scipy import special
+
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import materials_database as mat
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+from aide_design import solvers
+from aide_design import water_properties as wp
+
+ERGUN_INERTIAL = 1.75
+"""The coefficient of the inertial term of the Ergun equation."""
+
+FILTER_COEFFICIENT = 10 / u.m
+"""A typical filter coefficient of clean rapid sand filters: the share of
+the particles captured per unit depth of sand. Calibrate with plant data."""
+
+DENSITY_FILTER_DEPOSIT = 100 * u.kg/u.m**3
+"""A typical mass of captured solids per unit volume of the pores they fill.
+Calibrate with plant data."""
+
+
+def _diam_fractions(DiamEffective, RatioUniformity, NumFractions):
+    """Return the median grain diameter of equal mass sand fractions."""
+    Z10, Z60 = special.ndtri(0.1), special.ndtri(0.6)
+    Sigma = np.log(RatioUniformity) / (Z60-Z10)
+    Mu = np.log(DiamEffective) - Sigma * Z10
+    return np.exp(Mu + Sigma * special.ndtri(
+        (np.arange(NumFractions) + 0.5) / NumFractions))
+
+
+@u.wraps(u.m, [u.m, u.dimensionless, None], False)
+def diam_sand_fractions(DiamEffective=mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE,
+                        RatioUniformity=mat.RATIO_UNIFORMITY_COEFF_FILTER_SAND,
+                        NumFractions=20):
+    """Return the grain diameters of NumFractions equal mass sand fractions.
+
+    The grain sizes follow a lognormal distribution by mass, with 10% of the
+    mass finer than DiamEffective and 60% finer than
+    DiamEffective·RatioUniformity. Each fraction is represented by the
+    diameter at the middle of its share of the mass.
+    """
+    ut.check_range([DiamEffective, ">0", "DiamEffective"],
+                   [NumFractions, ">0, int", "NumFractions"])
+    if RatioUniformity <= 1:
+        raise ValueError("RatioUniformity must be greater than 1.")
+    return _diam_fractions(DiamEffective, RatioUniformity, NumFractions)
+
+
+def _headloss_per_sand(Porosity, Diam, Vel, Nu):
+    """Return the head loss per unit depth of a bed over its sand fraction."""
+    return ((36 * pk.K_KOZENY * Nu * Vel * (1-Porosity) / Diam**2
+             + ERGUN_INERTIAL * Vel**2 / Diam)
+            / (pk.GRAVITY * Porosity**3))
+
+
+@u.wraps((u.dimensionless, u.dimensionless, u.m),
+         [u.m/u.s, u.degK, u.m, u.m, u.dimensionless, u.dimensionless,
+          u.kg/u.m**3, None], False)
+def expansion_sand_bed(VelBackwash, Temp, Depth,
+                       DiamEffective=mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE,
+                       RatioUniformity=mat.RATIO_UNIFORMITY_COEFF_FILTER_SAND,
+                       Porosity=mat.POROSITY_FILTER_SAND,
+                       DensitySand=mat.RHO_FILTER_SAND, NumFractions=20):
+    """Return the expansion of a graded sand bed and its head loss.
+
+    VelBackwash is the upflow velocity through the bed, Temp the water
+    temperature and Depth the depth of the fixed bed, which has the
+    porosity Porosity. VelBackwash, Temp and Depth may be arrays, which are
+    broadcast against each other. The sand is split into NumFractions
+    fractions as in diam_sand_fractions.
+
+    Returns a tuple of the porosity of each fraction, with the fractions
+    along the last axis from fine to coarse, the ratio of the expanded to
+    the fixed depth of the bed (compare RATIO_FILTER_FLUIDIZED) and the
+    head loss through the bed. A fraction that the flow carries out of the
+    bed has a porosity of 1, which makes the expansion ratio infinite.
+    """
+    VelBackwash, Temp, Depth = (np.asarray(a, dtype=float)
+                                for a in (VelBackwash, Temp, Depth))
+    ut.check_range([np.ravel(VelBackwash), ">0", "Backwash velocity"],
+                   [np.ravel(Temp), ">0", "Temperature"],
+                   [np.ravel(Depth), ">0", "Depth"],
+                   [Porosity, "0-1", "Porosity"],
+                   [DensitySand, ">0", "Sand density"])
+    Diam = diam_sand_fractions(DiamEffective * u.m, RatioUniformity,
+                               NumFractions).magnitude
+    Vel = VelBackwash[..., np.newaxis]
+    Nu = wp.viscosity_kinematic_lookup(Temp)[..., np.newaxis]
+    Buoyancy = (DensitySand / wp.density_water_lookup(Temp) - 1)[...,
+                                                                  np.newaxis]
+
+    def residual(Porosity, Diam, Vel, Nu, Buoyancy):
+        return _headloss_per_sand(Porosity, Diam, Vel, Nu) - Buoyancy
+
+    fixed = residual(Porosity, Diam, Vel, Nu, Buoyancy) <= 0
+    washout = residual(1, Diam, Vel, Nu, Buoyancy) > 0
+    PorosityExpanded, Iterations, converged = solvers.bracketed_root(
+        residual, Porosity, 1, (Diam, Vel, Nu, Buoyancy), RTol=1e-12)
+    PorosityExpanded = np.where(fixed, Porosity,
+                                np.where(washout, 1, PorosityExpanded))
+    with np.errstate(divide='ignore'):
+        RatioExpansion = np.mean((1-Porosity) / (1-PorosityExpanded),
+                                 axis=-1)
+    # A fluidized fraction carries the buoyant weight of its sand.
+    HeadLoss = Depth * (1-Porosity) * np.mean(
+        np.minimum(_headloss_per_sand(Porosity, Diam, Vel, Nu), Buoyancy),
+        axis=-1)
+    return PorosityExpanded, RatioExpansion, HeadLoss
+
+
+def _capture(Depth, FilterCoefficient, NumSlices):
+    """Return the slice thickness and each slice's share of captured particles.
+
+    The share is that of the particles entering the layer.
+    """
+    Slice = Depth / NumSlices
+    Top = np.arange(NumSlices) * Slice[..., np.newaxis]
+    Capture = (np.exp(-FilterCoefficient[..., np.newaxis] * Top)
+               * (1 - np.exp(-FilterCoefficient * Slice))[..., np.newaxis])
+    return Slice, Capture
+
+
+def _resistance(Deposit, Slice, Capture, Diam, Porosity, Nu, DensityDeposit):
+    """Return the head loss per unit velocity of layers holding Deposit.
+
+    Deposit is the mass of solids per unit area in each layer. Layers whose
+    pores are full have an infinite resistance.
+    """
+    PorosityClogged = (Porosity[..., np.newaxis]
+                       - Deposit[..., np.newaxis] * Capture
+                       / (Slice * DensityDeposit)[..., np.newaxis])
+    full = np.any(PorosityClogged <= 0, axis=-1)
+    PorosityClogged = np.where(PorosityClogged > 0, PorosityClogged, 1)
+    Resistance = np.sum(pk.headloss_kozeny(
+        Slice[..., np.newaxis], Diam[..., np.newaxis], 1, PorosityClogged,
+        Nu[..., np.newaxis]), axis=-1)
+    return np.where(full, np.inf, Resistance)
+
+
+def _headloss_load(VelLayer, Slice, Capture, Diam, Porosity, Nu,
+                   DensityDeposit, HeadLossDirty, NumLoadSteps):
+    """Return the head loss of filters as a function of their load.
+
+    The load is the mass of solids per unit area that a layer at VelLayer
+    would have received since the last backwash. Returns the loads and the
+    head losses along the first axis, up to past HeadLossDirty, and the
+    load at which each filter reaches HeadLossDirty.
+    """
+    NumLayers = Slice.shape[-1]
+    args = (Slice, Capture, Diam, Porosity, Nu, DensityDeposit)
+
+    def conductance(Deposit, *args):
+        return 1 / _resistance(Deposit, *args)
+
+    def headloss(Deposit, VelLayer, *args):
+        return (NumLayers * VelLayer
+                / np.sum(conductance(Deposit, *args), axis=-1))
+
+    if np.any(headloss(np.zeros(Slice.shape), VelLayer, *args)
+              >= HeadLossDirty):
+        raise ValueError("The clean bed head loss is above HeadLossDirty.")
+
+    # With an even split every layer holds the same deposit, which sets the
+    # scale of the load steps.
+    # The head loss grows without bound as the top slice fills, so the
+    # residual is taken on a log scale.
+    def excess(Deposit, f):
+        return np.log(headloss(Deposit[:, np.newaxis], VelLayer[f],
+                               *(a[f] for a in args)) / HeadLossDirty[f])
+
+    Full = np.min(Porosity * Slice * DensityDeposit / Capture[..., 0], axis=-1)
+    DepositDirty = solvers.bracketed_root(excess, 0, Full * (1-1e-9),
+                                          (np.arange(len(Full)),))[0]
+    LoadStep = 2 * DepositDirty / NumLoadSteps
+    Deposit = np.zeros(Slice.shape)
+    Loads = [np.zeros(len(LoadStep))]
+    HeadLosses = [headloss(Deposit, VelLayer, *args)]
+    # Each layer takes its share of the load, in proportion to its
+    # conductance. The deposits are integrated over the load with Heun's
+    # method.
+    while np.any(HeadLosses[-1] < HeadLossDirty):
+        Share = conductance(Deposit, *args)
+        Share = Share / np.sum(Share, axis=-1, keepdims=True)
+        Trial = Deposit + NumLayers * LoadStep[:, np.newaxis] * Share
+        ShareTrial = conductance(Trial, *args)
+        ShareTrial = ShareTrial / np.sum(ShareTrial, axis=-1, keepdims=True)
+        Deposit = (Deposit + NumLayers * LoadStep[:, np.newaxis]
+                   * (Share+ShareTrial) / 2)
+        Loads.append(Loads[-1] + LoadStep)
+        HeadLosses.append(headloss(Deposit, VelLayer, *args))
+    Loads, HeadLosses = np.array(Loads), np.array(HeadLosses)
+    HeadLosses = np.maximum.accumulate(HeadLosses, axis=0)
+    LoadDirty = np.array([np.interp(HeadLossDirty[f], HeadLosses[:, f],
+                                    Loads[:, f])
+                          for f in range(len(LoadStep))])
+    return Loads, HeadLosses, LoadDirty
+
+
+def filter_headloss_stream(Turbidity, TimeStep, Temp,
+                           VelLayer=exp.VEL_FILTER_LAYER,
+                           DepthLayer=exp.HEIGHT_FILTER_LAYER_MIN,
+                           NumLayers=exp.N_FILTER_LAYER,
+                           DiamSand=mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE,
+                           Porosity=mat.POROSITY_FILTER_SAND,
+                           FilterCoefficient=FILTER_COEFFICIENT,
+                           DensityDeposit=DENSITY_FILTER_DEPOSIT,
+                           HeadLossDirty=exp.HEADLOSS_FILTER_DIRTY,
+                           TurbidityUnit=u.NTU, NumSlices=20,
+                           NumLoadSteps=400):
+    """Yield the head loss of stacked rapid sand filters over a run.
+
+    Turbidity is an iterable of chunks of the influent turbidity, in
+    TurbidityUnit, with the time steps of TimeStep along the first axis.
+    The filters are described by Temp, VelLayer (the design velocity
+    through each layer), DiamSand, Porosity, FilterCoefficient and
+    DensityDeposit, which may be arrays that are broadcast against each
+    other, and DepthLayer, which may also hold the depth of each of the
+    NumLayers layers along its last axis. The remaining axes of each chunk
+    are broadcast against the filters, so one turbidity series can feed
+    many filters.
+
+    Yields, for each chunk, a tuple of the head loss through the sand at
+    the end of each time step and a mask of the time steps at whose end
+    each filter reached HeadLossDirty and was backwashed.
+    """
+    TimeStep, Temp, VelLayer, DepthLayer, DiamSand, Porosity, \
+        FilterCoefficient, DensityDeposit, HeadLossDirty = (
+            np.asarray(ut.magnitude_in(value, unit), dtype=float)
+            for value, unit in (
+                (TimeStep, u.s), (Temp, u.degK), (VelLayer, u.m/u.s),
+                (DepthLayer, u.m), (DiamSand, u.m),
+                (Porosity, u.dimensionless), (FilterCoefficient, 1/u.m),
+                (DensityDeposit, u.kg/u.m**3), (HeadLossDirty, u.m)))
+    ut.check_range([np.ravel(TimeStep), ">0", "TimeStep"],
+                   [np.ravel(VelLayer), ">0", "VelLayer"],
+                   [np.ravel(DepthLayer), ">0", "DepthLayer"],
+                   [np.ravel(DiamSand), ">0", "DiamSand"],
+                   [np.ravel(Porosity), "0-1", "Porosity"],
+                   [np.ravel(FilterCoefficient), ">0", "FilterCoefficient"],
+                   [np.ravel(DensityDeposit), ">0", "DensityDeposit"],
+                   [NumLayers, ">0, int", "NumLayers"],
+                   [NumSlices, ">0, int", "NumSlices"])
+    Concentration = (1 * TurbidityUnit).to(u.kg/u.m**3).magnitude
+    DepthLayer = np.broadcast_to(DepthLayer, DepthLayer.shape[:-1]
+                                 + (NumLayers,) if DepthLayer.ndim
+                                 else (NumLayers,))
+    filters = (Temp, VelLayer, DiamSand, Porosity, FilterCoefficient,
+               DensityDeposit, HeadLossDirty)
+    # The first chunk tells how the series are spread over the filters.
+    Turbidity = iter(Turbidity)
+    first = next(Turbidity, None)
+    if first is None:
+        return
+    first = np.asarray(first, dtype=float)
+    shape = np.broadcast_shapes(first.shape[1:], DepthLayer.shape[:-1],
+                                *(a.shape for a in filters))
+    Temp, VelLayer, DiamSand, Porosity, FilterCoefficient, DensityDeposit, \
+        HeadLossDirty = (np.broadcast_to(a, shape).reshape(-1)
+                         for a in filters)
+    DepthLayer = np.broadcast_to(DepthLayer, shape + (NumLayers,)).reshape(
+        -1, NumLayers)
+    Slice, Capture = _capture(DepthLayer, FilterCoefficient[:, np.newaxis],
+                              NumSlices)
+    Loads, HeadLosses, LoadDirty = _headloss_load(
+        VelLayer, Slice, Capture, DiamSand[:, np.newaxis],
+        Porosity[:, np.newaxis], wp.viscosity_kinematic_lookup(Temp)[
+            :, np.newaxis], DensityDeposit[:, np.newaxis], HeadLossDirty,
+        NumLoadSteps)
+
+    # The load of the current run of each filter.
+    Load = np.zeros(LoadDirty.size)
+    for chunk in itertools.chain([first], Turbidity):
+        chunk = np.asarray(chunk, dtype=float)
+        NumSteps = len(chunk)
+        chunk = np.broadcast_to(chunk, (NumSteps,) + shape).reshape(
+            NumSteps, -1)
+        Cumulative = Load + np.cumsum(VelLayer * Concentration * chunk
+                                      * TimeStep, axis=0)
+        HeadLoss = np.empty(Cumulative.shape)
+        Backwash = np.zeros(Cumulative.shape, dtype=bool)
+        for f in range(LoadDirty.size):
+            Start = np.zeros(NumSteps)
+            Event = np.searchsorted(Cumulative[:, f], LoadDirty[f])
+            while Event < NumSteps:
+                Backwash[Event, f] = True
+                if Event + 1 < NumSteps:
+                    Start[Event + 1] = Cumulative[Event, f]
+                Event = np.searchsorted(Cumulative[:, f],
+                                        Cumulative[Event, f] + LoadDirty[f])
+            RunLoad = Cumulative[:, f] - np.maximum.accumulate(Start)
+            HeadLoss[:, f] = np.interp(RunLoad, Loads[:, f], HeadLosses[:, f])
+            Load[f] = 0 if Backwash[-1, f] else RunLoad[-1]
+        yield (HeadLoss.reshape((NumSteps,) + shape) * u.m,
+               Backwash.reshape((NumSteps,) + shape))
+
+
+def time_filter_dirty(Turbidity, TimeStep, Temp, **kwargs):
+    """Return the time at which each filter first reaches HeadLossDirty.
+
+    Takes the same inputs as filter_headloss_stream, starting from clean
+    filters. Filters that do not get dirty within the series return nan.
+    """
+    TimeStep = ut.magnitude_in(TimeStep, u.s)
+    TimeDirty, Elapsed = None, 0
+    for HeadLoss, Backwash in filter_headloss_stream(Turbidity, TimeStep,
+                                                     Temp, **kwargs):
+        if TimeDirty is None:
+            TimeDirty = np.full(Backwash.shape[1:], np.nan)
+        first = Backwash.any(axis=0) & np.isnan(TimeDirty)
+        TimeDirty[first] = (Elapsed + np.argmax(Backwash, axis=0)[first]
+                            + 1) * TimeStep
+        Elapsed += len(Backwash)
+    return TimeDirty[()] * u.s
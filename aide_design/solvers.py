@@ -0,0 +1,150 @@
+"""
+Vectorized inverse solvers for the physchem head loss functions.
+
+physchem can invert pipe head loss (diam_pipe, flow_pipe) but the channel
+head loss functions, headloss_rect and headloss_gen, have no closed-form
+inverse. solve_headloss_rect and solve_headloss_gen find any one of their
+inputs given the head loss and the other inputs, over whole arrays at
+once, with the bracketed root finder bracketed_root.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import physchem_kernels as pk
+from aide_design import utility as ut
+
+
+def bracketed_root(func, Lower, Upper, args=(), RTol=1e-10, MaxIter=100,
+                   XTol=0):
+    """Return the roots of func between Lower and Upper, element by element.
+
+    func(x, *args) must accept arrays and return an array of residuals of
+    the same shape. Lower, Upper and args are broadcast against each other,
+    and func is only ever called on the subset of elements still being
+    solved, with the matching subset of args.
+
+    The roots are found with the Illinois variant of false position, which
+    keeps every root bracketed and converges superlinearly. An element stops
+    as soon as its bracket is narrower than XTol + RTol·|root| or its
+    residual is exactly zero.
+
+    Returns a tuple of three arrays with the broadcast shape: the roots, the
+    number of iterations each element took, and a mask of the elements that
+    converged. Elements whose residual does not change sign between Lower
+    and Upper, or that do not converge within MaxIter, are reported as not
+    converged; their root is nan.
+    """
+    Lower, Upper = np.asarray(Lower, dtype=float), np.asarray(Upper, dtype=float)
+    inputs = np.broadcast_arrays(Lower, Upper, *(np.asarray(a) for a in args))
+    shape = inputs[0].shape
+    a, b, *args = (np.array(arg).reshape(-1) for arg in inputs)
+    fa, fb = func(a, *args), func(b, *args)
+    root = np.full(a.size, np.nan)
+    Iterations = np.zeros(a.size, dtype=int)
+    converged = np.zeros(a.size, dtype=bool)
+    for x, fx in ((a, fa), (b, fb)):
+        exact = fx == 0
+        root[exact], converged[exact] = x[exact], True
+    active = np.flatnonzero(~converged & (np.sign(fa) * np.sign(fb) < 0))
+    # The side of the bracket that moved last: -1 for a, 1 for b.
+    side = np.zeros(a.size, dtype=int)
+    for _ in range(MaxIter):
+        if active.size == 0:
+            break
+        aa, bb, faa, fbb = a[active], b[active], fa[active], fb[active]
+        x = bb - fbb * (bb-aa) / (fbb-faa)
+        fx = func(x, *(arg[active] for arg in args))
+        Iterations[active] += 1
+        moveA = np.sign(fx) == np.sign(faa)
+        # Halve the residual kept at the end that did not move twice in a
+        # row, so that neither end of the bracket can stall.
+        stale = side[active] == np.where(moveA, -1, 1)
+        a[active] = np.where(moveA, x, aa)
+        fa[active] = np.where(moveA, fx, np.where(stale, faa / 2, faa))
+        b[active] = np.where(moveA, bb, x)
+        fb[active] = np.where(moveA, np.where(stale, fbb / 2, fbb), fx)
+        side[active] = np.where(moveA, -1, 1)
+        done = ((fx == 0)
+                | (np.abs(b[active] - a[active]) <= XTol + RTol * np.abs(x)))
+        root[active[done]] = x[done]
+        converged[active[done]] = True
+        active = active[~done]
+    return (root.reshape(shape)[()], Iterations.reshape(shape)[()],
+            converged.reshape(shape)[()])
+
+
+_SI_UNITS = {'FlowRate': u.m**3/u.s, 'Width': u.m, 'DistCenter': u.m,
+             'Length': u.m, 'KMinor': u.dimensionless, 'Nu': u.m**2/u.s,
+             'PipeRough': u.m, 'Area': u.m**2, 'Vel': u.m/u.s,
+             'PerimWetted': u.m, 'openchannel': None}
+"""The SI unit of every argument of headloss_rect and headloss_gen."""
+
+
+def _solve_headloss(kernel, argnames, HeadLoss, Unknown, Lower, Upper,
+                    knowns, RTol, MaxIter):
+    """Solve kernel(*args) = HeadLoss for the argument named Unknown."""
+    solvable = [name for name in argnames if name != 'openchannel']
+    if Unknown not in solvable:
+        raise ValueError("Cannot solve for {0}. Use one of {1}.".format(
+            Unknown, solvable))
+    missing = set(argnames) - set(knowns) - {Unknown}
+    extra = set(knowns) - set(argnames) | set(knowns) & {Unknown}
+    if missing or extra:
+        raise TypeError("Expected the known inputs {0}.".format(
+            [name for name in argnames if name != Unknown]))
+    HeadLoss = ut.magnitude_in(HeadLoss, u.m)
+    ut.check_range([HeadLoss, ">0", "Headloss"])
+    unit = _SI_UNITS[Unknown]
+    knownNames = [name for name in argnames if name != Unknown]
+
+    def residual(x, HeadLoss, *known):
+        values = dict(zip(knownNames, known), **{Unknown: x})
+        return kernel(*(values[name] for name in argnames)) - HeadLoss
+
+    root, Iterations, converged = bracketed_root(
+        residual, ut.magnitude_in(Lower, unit), ut.magnitude_in(Upper, unit),
+        (HeadLoss, *(ut.magnitude_in(knowns[name], _SI_UNITS[name])
+                     for name in knownNames)),
+        RTol, MaxIter)
+    return root * unit, Iterations, converged
+
+
+def solve_headloss_rect(HeadLoss, Unknown, Lower, Upper, RTol=1e-10,
+                        MaxIter=100, **knowns):
+    """Solve physchem.headloss_rect for one of its inputs.
+
+    Unknown names the input to solve for: 'FlowRate', 'Width', 'DistCenter',
+    'Length', 'KMinor', 'Nu' or 'PipeRough'. Every other input of
+    headloss_rect, including openchannel, is given as a keyword argument.
+    The root is searched for between Lower and Upper, which must bracket
+    it. HeadLoss, the bounds and the known inputs may be arrays, which are
+    broadcast against each other.
+
+    Returns the solution as a Quantity in SI units, the number of iterations
+    of each element and a mask of the elements that converged, as in
+    bracketed_root. The bounds must lie where headloss_rect is defined, so
+    use a small positive lower bound rather than zero for flows, velocities
+    and dimensions.
+    """
+    return _solve_headloss(pk.headloss_rect,
+                           ('FlowRate', 'Width', 'DistCenter', 'Length',
+                            'KMinor', 'Nu', 'PipeRough', 'openchannel'),
+                           HeadLoss, Unknown, Lower, Upper, knowns, RTol,
+                           MaxIter)
+
+
+def solve_headloss_gen(HeadLoss, Unknown, Lower, Upper, RTol=1e-10,
+                       MaxIter=100, **knowns):
+    """Solve physchem.headloss_gen for one of its inputs.
+
+    Unknown names the input to solve for: 'Area', 'Vel', 'PerimWetted',
+    'Length', 'KMinor', 'Nu' or 'PipeRough'. Every other input of
+    headloss_gen is given as a keyword argument. Otherwise this works like
+    solve_headloss_rect.
+    """
+    return _solve_headloss(pk.headloss_gen,
+                           ('Area', 'Vel', 'PerimWetted', 'Length', 'KMinor',
+                            'Nu', 'PipeRough'),
+                           HeadLoss, Unknown, Lower, Upper, knowns, RTol,
+                           MaxIter)
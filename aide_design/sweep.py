@@ -0,0 +1,177 @@
+"""
+Design-space sweeps with chunked, memory-mapped output.
+
+sweep evaluates a function over the cartesian product of named parameter
+axes, such as flow rate, diameter, temperature and roughness. Products of
+4-6 axes easily reach 10⁸ points, more than fit in memory, so the points
+are evaluated ChunkSize at a time and written straight into a
+memory-mapped .npy file. The axes and their units are saved next to it,
+and so is the number of chunks done, so an interrupted sweep picks up
+where it stopped when it is run again.
+
+A sweep lives in a directory with three files:
+
+    result.npy  the result, with one dimension per axis, in axis order
+    axes.npz    the magnitudes of the axes, by name
+    sweep.json  the axis names and units, the result unit, the chunk size,
+                the number of chunks done and what was evaluated: the
+                name of func and the Fixed values with their units
+
+load_sweep opens a finished sweep without reading the result into memory.
+"""
+
+import json
+import os
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+
+
+def _split_units(value):
+    """Return the magnitude of value and its unit string, or None."""
+    if isinstance(value, u.Quantity):
+        return value.magnitude, str(value.units)
+    return value, None
+
+
+def _with_units(magnitude, unit):
+    """Return magnitude as a Quantity in unit, or as is if unit is None."""
+    return magnitude if unit is None else u.Quantity(magnitude, unit)
+
+
+def _write_state(path, state):
+    """Replace sweep.json in one step, so it is never left half written."""
+    temp = os.path.join(path, 'sweep.json.tmp')
+    with open(temp, 'w') as file:
+        json.dump(state, file, indent=1, default=repr)
+    os.replace(temp, os.path.join(path, 'sweep.json'))
+
+
+def _func_name(func):
+    """Return the module and qualified name of func."""
+    name = getattr(func, '__qualname__', type(func).__qualname__)
+    return '{0}.{1}'.format(getattr(func, '__module__', None), name)
+
+
+def _fingerprint(Fixed):
+    """Return the Fixed values as JSON-safe [magnitude, unit] pairs."""
+    fingerprint = {}
+    for name in sorted(Fixed):
+        magnitude, unit = _split_units(Fixed[name])
+        fingerprint[name] = [np.asarray(magnitude).tolist(), unit]
+    return fingerprint
+
+
+def _same_json(a, b):
+    """Return whether a and b serialize alike; unlike ==, nan matches nan."""
+    return (json.dumps(a, sort_keys=True, default=repr)
+            == json.dumps(b, sort_keys=True, default=repr))
+
+
+def _resume_state(path, names, units, axes, dtype, ChunkSize, Func, Fixed):
+    """Return the saved state of a sweep if it matches, else None.
+
+    Func and Fixed are the _func_name and _fingerprint of the sweep.
+    Raises ValueError if a sweep with other axes or settings is saved there.
+    """
+    try:
+        with open(os.path.join(path, 'sweep.json')) as file:
+            state = json.load(file)
+    except FileNotFoundError:
+        return None
+    with np.load(os.path.join(path, 'axes.npz')) as saved:
+        same = (state['names'] == names and state['units'] == units
+                and state['dtype'] == np.dtype(dtype).str
+                and state['ChunkSize'] == ChunkSize
+                and state.get('Func') == Func
+                and _same_json(state.get('Fixed'), Fixed)
+                and all(np.array_equal(saved[name], axis)
+                        for name, axis in zip(names, axes)))
+    if not same:
+        raise ValueError("{0} holds a different sweep. Use another path or "
+                         "Resume=False.".format(path))
+    return state
+
+
+def sweep(func, path, Axes, Fixed=None, ChunkSize=2**20, dtype=np.float64,
+          Resume=True):
+    """Evaluate func over the cartesian product of Axes into path.
+
+    Axes is a dict of 1-D arrays or Quantities by parameter name, in the
+    order of the result's dimensions. func is called with a keyword
+    argument for every axis, holding the axis values of up to ChunkSize
+    points, and with the keyword arguments in Fixed. It must return one
+    value per point, as physchem, physchem_kernels and floc_model functions
+    do; Quantity axes keep their units, so functions with units can be
+    swept directly. To evaluate each chunk on several threads, pass
+    parallel.threaded(func).
+
+    dtype is the dtype of the stored result; np.float32 halves the file.
+    With Resume, a sweep already saved in path with the same func, axes,
+    Fixed values, dtype and ChunkSize continues from its last finished
+    chunk; func is compared by its module and qualified name. A sweep saved
+    there with anything else different raises ValueError. The sweep starts
+    over only if path holds no sweep or Resume is False.
+
+    Returns the result and its axes, as load_sweep does.
+    """
+    os.makedirs(path, exist_ok=True)
+    Fixed = {} if Fixed is None else Fixed
+    names = list(Axes)
+    axes, units = zip(*(_split_units(Axes[name]) for name in names))
+    axes = [np.asarray(axis).reshape(-1) for axis in axes]
+    units = list(units)
+    shape = tuple(len(axis) for axis in axes)
+    resultPath = os.path.join(path, 'result.npy')
+    Func = _func_name(func)
+    fingerprint = _fingerprint(Fixed)
+    state = (_resume_state(path, names, units, axes, dtype, ChunkSize, Func,
+                           fingerprint)
+             if Resume else None)
+    if state is None:
+        state = dict(names=names, units=units, unit=None,
+                     dtype=np.dtype(dtype).str, ChunkSize=ChunkSize,
+                     Func=Func, Fixed=fingerprint, ChunksDone=0)
+        np.savez(os.path.join(path, 'axes.npz'),
+                 **dict(zip(names, axes)))
+        result = np.lib.format.open_memmap(resultPath, mode='w+',
+                                           dtype=dtype, shape=shape)
+        _write_state(path, state)
+    else:
+        result = np.load(resultPath, mmap_mode='r+')
+    flat = result.reshape(-1)
+    size = flat.size
+    for start in range(state['ChunksDone'] * ChunkSize, size, ChunkSize):
+        index = np.unravel_index(np.arange(start, min(start + ChunkSize,
+                                                      size)), shape)
+        values = {name: _with_units(axis[i], unit)
+                  for name, axis, i, unit in zip(names, axes, index, units)}
+        value, unit = _split_units(func(**values, **Fixed))
+        if state['unit'] is None:
+            state['unit'] = unit
+        elif unit is not None:
+            value = u.Quantity(value, unit).to(state['unit']).magnitude
+        flat[start:start + ChunkSize] = value
+        result.flush()
+        state['ChunksDone'] += 1
+        _write_state(path, state)
+    del flat, result
+    return load_sweep(path)
+
+
+def load_sweep(path):
+    """Return the result and axes of the sweep saved in path.
+
+    The result is a read-only memory map of result.npy and is not read into
+    memory. Returns a tuple of the result, its unit string (None if func
+    returned plain numbers) and a dict of the axes by name, as Quantities
+    if they had units.
+    """
+    with open(os.path.join(path, 'sweep.json')) as file:
+        state = json.load(file)
+    with np.load(os.path.join(path, 'axes.npz')) as saved:
+        axes = {name: _with_units(saved[name], unit)
+                for name, unit in zip(state['names'], state['units'])}
+    return (np.load(os.path.join(path, 'result.npy'), mmap_mode='r'),
+            state['unit'], axes)
@@ -0,0 +1,134 @@
+"""
+Monte Carlo propagation of input uncertainty through the physchem kernels.
+
+Field values such as pipe roughness (materials_database.PIPE_ROUGH_PVC),
+water temperature and minor loss coefficients are rarely known exactly.
+monte_carlo draws many samples of the uncertain inputs of a
+physchem_kernels function from Distributions, evaluates the kernel on
+whole chunks of samples at a time and returns percentiles of the result.
+
+Every chunk of samples draws from its own random stream, spawned from one
+numpy SeedSequence. The samples therefore depend only on the seed and the
+chunk size, not on the order in which the chunks are evaluated, so chunks
+can be spread over threads and the results stay reproducible.
+"""
+
+import inspect
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import parallel
+from aide_design import physchem_kernels as pk
+
+
+def _si(value):
+    """Return the magnitude of a Quantity in SI base units, or value itself."""
+    if isinstance(value, u.Quantity):
+        return value.to_base_units().magnitude
+    return value
+
+
+class Distribution:
+    """An uncertain input, drawn with a method of numpy.random.Generator.
+
+    The parameters are converted to SI base units before sampling, so they
+    may be Quantities in any units; a temperature may be given as a mean in
+    u.degC with a standard deviation in u.delta_degC. Transform, if given,
+    is applied to the SI samples, for example
+    water_properties.viscosity_kinematic to turn sampled temperatures into
+    the kinematic viscosity that the kernels take.
+    """
+
+    def __init__(self, method, *params, Transform=None):
+        self.method = method
+        self.params = tuple(_si(param) for param in params)
+        self.Transform = Transform
+
+    def sample(self, rng, size):
+        """Return size samples drawn with the Generator rng."""
+        samples = getattr(rng, self.method)(*self.params, size=size)
+        return samples if self.Transform is None else self.Transform(samples)
+
+
+def normal(Mean, StdDev, Transform=None):
+    """Return a normal Distribution."""
+    return Distribution('normal', Mean, StdDev, Transform=Transform)
+
+
+def uniform(Low, High, Transform=None):
+    """Return a uniform Distribution between Low and High."""
+    return Distribution('uniform', Low, High, Transform=Transform)
+
+
+def triangular(Low, Mode, High, Transform=None):
+    """Return a triangular Distribution between Low and High."""
+    return Distribution('triangular', Low, Mode, High, Transform=Transform)
+
+
+def lognormal(Median, Sigma, Transform=None):
+    """Return a lognormal Distribution.
+
+    Sigma is the standard deviation of the natural log of the samples, so
+    about two thirds of the samples lie between Median/e^Sigma and
+    Median·e^Sigma. Use it for inputs that must stay positive, such as
+    roughness.
+    """
+    Median = _si(Median)
+    return Distribution('lognormal', np.log(Median), Sigma,
+                        Transform=Transform)
+
+
+def monte_carlo(kernel, NumSamples, Seed=None, Percentiles=(5, 50, 95),
+                ChunkSize=2**16, Threads=1, **inputs):
+    """Return percentiles of a kernel's result over uncertain inputs.
+
+    kernel is a function of physchem_kernels or its name, for example
+    pk.headloss or 'flow_pipe'. Every parameter of the kernel without a
+    default is given as a keyword argument: a Distribution, or a fixed
+    number, array or Quantity. Quantities are converted to SI base units.
+    The kernel is evaluated on ChunkSize samples at a time, on Threads
+    threads of the parallel module's pool.
+
+    Seed is anything numpy.random.SeedSequence accepts; the same Seed,
+    NumSamples and ChunkSize always give the same samples, whatever the
+    number of threads.
+
+    Returns a tuple of the percentiles of the result, in the SI units of
+    the kernel, and the array of all NumSamples results.
+    """
+    if isinstance(kernel, str):
+        kernel = getattr(pk, kernel)
+    parameters = inspect.signature(kernel).parameters
+    missing = [name for name, parameter in parameters.items()
+               if parameter.default is inspect.Parameter.empty
+               and name not in inputs]
+    extra = set(inputs) - set(parameters)
+    if missing or extra:
+        raise TypeError("{0} takes the inputs {1}.".format(
+            kernel.__name__, list(parameters)))
+    fixed = {name: _si(value) for name, value in inputs.items()
+             if not isinstance(value, Distribution)}
+    # Draw in the kernel's parameter order, whatever the keyword order.
+    random = [(name, inputs[name]) for name in parameters
+              if isinstance(inputs.get(name), Distribution)]
+    starts = range(0, NumSamples, ChunkSize)
+    streams = np.random.SeedSequence(Seed).spawn(len(starts))
+    results = np.empty(NumSamples)
+
+    def run(chunk):
+        start, stream = chunk
+        size = min(ChunkSize, NumSamples - start)
+        rng = np.random.default_rng(stream)
+        values = dict(fixed)
+        for name, distribution in random:
+            values[name] = distribution.sample(rng, size)
+        results[start:start + size] = kernel(**values)
+
+    chunks = list(zip(starts, streams))
+    if Threads > 1:
+        list(parallel._pool(Threads).map(run, chunks))
+    else:
+        for chunk in chunks:
+            run(chunk)
+    return np.percentile(results, Percentiles), results
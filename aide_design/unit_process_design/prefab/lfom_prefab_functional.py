@@ -30,6 +30,9 @@ from aide_design.units import unit_registry as u
 # utility has the significant digit display function
 from aide_design import utility as ut
 
+# jit has the compiled row by row orifice placement loop
+from aide_design import jit
+
 # import export inputs and define the VC coefficient
 from aide_design import expert_inputs as exp
 ratio_VC_orifice= exp.RATIO_VC_ORIFICE
@@ -145,10 +148,9 @@ def flow_lfom_actual(FLOW,HL_LFOM,drill_bits,Row_Index_Submerged,N_LFOM_Orifices
     row_height=dist_center_lfom_rows(FLOW,HL_LFOM)
     #harray is the distance from the water level to the center of the orifices when the water is at the max level 
     harray = (np.linspace(row_height.to(u.mm).magnitude,HL_LFOM.to(u.mm).magnitude,n_lfom_rows(FLOW,HL_LFOM)))*u.mm -0.5* D_LFOM_Orifices 
-    FLOW_new=0*u.m**3/u.s
-    for i in range(Row_Index_Submerged+1):   
-        FLOW_new = FLOW_new + (N_LFOM_Orifices[i]*(pc.flow_orifice_vert(D_LFOM_Orifices,harray[Row_Index_Submerged-i],ratio_VC_orifice)))
-    return FLOW_new
+    #Evaluate all of the submerged rows at once; row i sits under harray[Row_Index_Submerged-i]
+    FLOW_rows = pc.flow_orifice_vert(D_LFOM_Orifices,harray[Row_Index_Submerged::-1],ratio_VC_orifice)
+    return (N_LFOM_Orifices[:Row_Index_Submerged+1]*FLOW_rows).sum()
 
 
 #Calculate number of orifices at each level given a diameter
@@ -157,18 +159,16 @@ def n_lfom_orifices(FLOW,HL_LFOM,drill_bits,SDR_LFOM):
     n_orifices_max =n_lfom_orifices_per_row_max(FLOW,HL_LFOM,drill_bits,SDR_LFOM)
     n_rows = (n_lfom_rows(FLOW,HL_LFOM))
     D_LFOM_Orifices = orifice_diameter(FLOW,HL_LFOM,drill_bits)
-    # H is distance from the elevation between two rows of orifices down to the center of the orifices
-    H=dist_center_lfom_rows(FLOW,HL_LFOM)-D_LFOM_Orifices*0.5
-    n=[]                       
-    for i in range(n_rows):
-        #place zero in the row that we are going to calculate the required number of orifices
-        n=np.append(n,0)
-        #calculate the ideal number of orifices at the current row without constraining to an integer
-        n_orifices_real=((FLOW_ramp_local[i]-flow_lfom_actual(FLOW,HL_LFOM,drill_bits,i,n))/
-                                  pc.flow_orifice_vert(D_LFOM_Orifices,H,ratio_VC_orifice)).to(u.dimensionless).magnitude
-        #constrain number of orifices to be less than the max per row and greater or equal to 0                 
-        n[i]=min((max(0,round(n_orifices_real))),n_orifices_max)
-    return n
+    row_height=dist_center_lfom_rows(FLOW,HL_LFOM)
+    # harray[k] is the distance from the water level down to the center of
+    # the orifices k rows below the top submerged row, as in flow_lfom_actual.
+    # harray[0] is the head on the row whose orifices are being placed.
+    harray = (np.linspace(row_height.to(u.mm).magnitude,HL_LFOM.to(u.mm).magnitude,n_rows))*u.mm -0.5* D_LFOM_Orifices
+    FLOW_rows = pc.flow_orifice_vert(D_LFOM_Orifices,harray,ratio_VC_orifice)
+    #the row by row placement runs as a compiled loop when numba is installed
+    return jit.lfom_orifice_counts(FLOW_ramp_local.to(u.m**3/u.s).magnitude,
+                                   FLOW_rows.to(u.m**3/u.s).magnitude,
+                                   n_orifices_max)
                      
 
 #This function calculates the error of the design based on the differences between the predicted flow rate
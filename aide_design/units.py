@@ -18,6 +18,11 @@ an operation on quantities whose units come from different unit
 registries raises an exception). This module contains a single global
 unit registry `unit_registry` that can be used by any number of other
 modules.
+
+`unit_registry` is also made pint's application registry, so quantities
+that are pickled and unpickled in another process, for example by
+`multiprocessing`, are rebuilt against that process's `unit_registry`.
+`aide_design.parallel.map` runs functions on a process pool this way.
 """
 
 import os
@@ -25,4 +30,6 @@ import pint
 
 unit_registry = pint.UnitRegistry(system='mks', autoconvert_offset_to_baseunit=True)
 
-unit_registry.load_definitions(os.path.join(os.path.dirname(__file__), "data/unit_definitions.txt"))
\ No newline at end of file
+unit_registry.load_definitions(os.path.join(os.path.dirname(__file__), "data/unit_definitions.txt"))
+
+pint.set_application_registry(unit_registry)
@@ -99,6 +99,17 @@ def stepceil_with_units(param, step, unit):
     return counter
 
 
+def magnitude_in(value, unit):
+    """Return the magnitude of value expressed in unit.
+
+    Plain numbers and arrays are assumed to already be in unit, as with
+    the non-strict u.wraps decorators in physchem.
+    """
+    if isinstance(value, u.Quantity):
+        return value.to(unit).magnitude
+    return value
+
+
 # Take the values of the array, compare to x, find the index of the first value less than or equal to x
 def floor_nearest(x,array):
     myindex = np.argmax(array >= x) - 1
@@ -0,0 +1,121 @@
+"""
+Water hammer in a pipe closed by a valve, by the method of characteristics.
+
+A pipe runs from a reservoir to a valve that discharges to the atmosphere.
+When the valve closes, pressure waves travel along the pipe at the wave
+speed, which for a plastic SDR pipe follows from the bulk modulus of water
+and the elastic modulus and wall thickness of the pipe (wave_speed_sdr).
+
+water_hammer divides the pipe into NumReaches reaches and steps in time by
+the time a wave takes to cross one reach. Along the characteristic lines
+dx/dt = ±a the momentum and continuity equations become
+
+    H[P] = CP - B·Q[P],    CP = H[A] + B·Q[A] - R·Q[A]·|Q[A]|
+    H[P] = CM + B·Q[P],    CM = H[B] - B·Q[B] + R·Q[B]·|Q[B]|
+
+where A and B are the neighbouring nodes at the previous time step,
+B = a/(g·Area) and R = f·Δx/(2·g·Diam·Area²), with the friction factor f of
+the steady flow. Each time step updates every node at once. The reservoir
+fixes the head at the upstream node, and at the valve the flow is
+proportional to the square root of the head across it, scaled by the
+valve's relative opening.
+
+The heads are in m of water above the valve outlet. Column separation,
+where the head falls to the vapour pressure of water, is not modelled, so
+a minimum head far below the pipe is a sign that it would occur.
+"""
+
+import numpy as np
+
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import physchem_kernels as pk
+from aide_design import pipedatabase as pipe
+from aide_design import utility as ut
+
+BULK_MODULUS_WATER = 2.19 * u.GPa
+
+MODULUS_ELASTIC_PVC = 3.3 * u.GPa
+
+
+def _wave_speed(SDR, ModulusPipe):
+    """Return the wave speed, in m/s, of a thin walled SDR pipe."""
+    BulkModulus = BULK_MODULUS_WATER.to(u.Pa).magnitude
+    # The ratio of the inner diameter to the wall thickness is SDR - 2.
+    return np.sqrt(BulkModulus / exp.DENSITY_WATER.to(u.kg/u.m**3).magnitude
+                   / (1 + BulkModulus / ModulusPipe * (SDR-2)))
+
+
+@u.wraps(u.m/u.s, [u.dimensionless, u.Pa], False)
+def wave_speed_sdr(SDR, ModulusPipe=MODULUS_ELASTIC_PVC):
+    """Return the speed of pressure waves in a water filled SDR pipe."""
+    ut.check_range([SDR, ">0", "SDR"], [ModulusPipe, ">0", "ModulusPipe"])
+    return _wave_speed(SDR, ModulusPipe)
+
+
+@u.wraps((u.m, u.m, u.m, u.m),
+         [u.m**3/u.s, u.inch, u.dimensionless, u.m, u.m, u.s, u.s,
+          u.m**2/u.s, u.m, u.dimensionless, u.Pa, None], False)
+def water_hammer(FlowRate, ND, SDR, Length, HeadReservoir, ValveClosureTime,
+                 Duration, Nu, PipeRough, ValveExponent=1,
+                 ModulusPipe=MODULUS_ELASTIC_PVC, NumReaches=100):
+    """Return the head envelope along a pipe after its valve closes.
+
+    The pipe is an SDR pipe from pipedatabase, of nominal diameter ND, that
+    carries FlowRate from a reservoir at HeadReservoir above the valve
+    outlet. Starting at time zero, the relative opening of the valve falls
+    as (1 - t/ValveClosureTime)**ValveExponent until it is closed at
+    ValveClosureTime. The transient is followed for Duration.
+
+    Returns a tuple of the distances of the NumReaches+1 nodes from the
+    reservoir, the largest and smallest head at each node over the whole
+    run, and the head upstream of the valve at every time step.
+    """
+    ut.check_range([FlowRate, ">0", "Flow rate"], [Length, ">0", "Length"],
+                   [ValveClosureTime, ">=0", "ValveClosureTime"],
+                   [Duration, ">0", "Duration"], [Nu, ">0", "Nu"],
+                   [PipeRough, "0-1", "Pipe roughness"],
+                   [ValveExponent, ">0", "ValveExponent"],
+                   [NumReaches, ">0, int", "NumReaches"])
+    Diam = pipe.ID_SDR(ND * u.inch, SDR).to(u.m).magnitude
+    Area = pk.area_circle(Diam)
+    WaveSpeed = _wave_speed(SDR, ModulusPipe)
+    Reach = Length / NumReaches
+    TimeStep = Reach / WaveSpeed
+    NumSteps = int(np.ceil(Duration / TimeStep))
+    B = WaveSpeed / (pk.GRAVITY * Area)
+    R = (pk.fric(FlowRate, Diam, Nu, PipeRough) * Reach
+         / (2 * pk.GRAVITY * Diam * Area**2))
+
+    # The steady flow loses head to friction at R per reach.
+    Distance = np.linspace(0, Length, NumReaches + 1)
+    Q = np.full(NumReaches + 1, float(FlowRate))
+    H = HeadReservoir - R * FlowRate**2 * np.arange(NumReaches + 1)
+    HeadValve0 = H[-1]
+    if HeadValve0 <= 0:
+        raise ValueError("The reservoir head is too low to carry the flow.")
+    # Flow through the valve is Opening·Q0·sqrt(H/H0).
+    Opening = np.zeros(NumSteps)
+    Time = np.arange(1, NumSteps + 1) * TimeStep
+    closing = Time < ValveClosureTime
+    Opening[closing] = (1 - Time[closing] / ValveClosureTime)**ValveExponent
+    ValveCoefficient = (Opening * FlowRate)**2 / (2 * HeadValve0)
+
+    HeadMax, HeadMin = H.copy(), H.copy()
+    HeadValve = np.empty(NumSteps)
+    for step in range(NumSteps):
+        Loss = R * Q * np.abs(Q)
+        BQ = B * Q
+        CP = H[:-1] + BQ[:-1] - Loss[:-1]
+        CM = H[1:] - BQ[1:] + Loss[1:]
+        H[1:-1] = (CP[:-1] + CM[1:]) / 2
+        Q[1:-1] = (CP[:-1] - CM[1:]) / (2 * B)
+        Q[0] = (HeadReservoir - CM[0]) / B
+        BC = B * ValveCoefficient[step]
+        Q[-1] = -BC + np.sqrt(BC**2 + 2 * ValveCoefficient[step]
+                              * max(CP[-1], 0))
+        H[-1] = CP[-1] - B * Q[-1]
+        np.maximum(HeadMax, H, out=HeadMax)
+        np.minimum(HeadMin, H, out=HeadMin)
+        HeadValve[step] = H[-1]
+    return Distance, HeadMax, HeadMin, HeadValve
@@ -8,7 +8,7 @@ setup(name='aide_design',
       author_email='aguaclara@cornell.edu',
       license='MIT',
       packages=find_packages(),
-      install_requires=['pint','numpy','pandas','matplotlib'],
+      install_requires=['pint>=0.9','numpy','pandas','matplotlib'],
       include_package_data=True,
       test_suite="tests",
       zip_safe=False)
\ No newline at end of file
@@ -0,0 +1,63 @@
+from aide_design.units import unit_registry as u
+from aide_design import channel_profile as cp
+from aide_design import physchem as pc
+from aide_design import physchem_kernels as pk
+from aide_design import solvers
+import numpy as np
+import unittest
+
+
+def height_water_normal(FlowRate, Width, Slope):
+    """Return the normal depth of the test channels."""
+    return solvers.bracketed_root(
+        lambda y, FlowRate: pk.headloss_fric_rect(
+            FlowRate, Width, y, 1, 1e-6, 0.001, True) - Slope,
+        1e-4, 5, (FlowRate,), RTol=1e-13)[0]
+
+
+class ProfileRectTest(unittest.TestCase):
+    """Test the standard step water surface profiles."""
+    FlowRate = np.array([0.05, 0.2, 0.5])
+
+    def test_uniform_flow(self):
+        """A channel at normal depth should stay at normal depth."""
+        Depth = height_water_normal(self.FlowRate, 0.5, 0.001)
+        Distance, profile = cp.profile_rect(self.FlowRate, 0.5, Depth, 0.001,
+                                            1, 20, 1e-6, 0.001)
+        self.assertEqual(profile.shape, (21, 3))
+        np.testing.assert_allclose(profile.magnitude, np.tile(Depth, (21, 1)),
+                                   rtol=1e-12)
+
+    def test_backwater(self):
+        """An M1 backwater curve should fall towards normal depth upstream."""
+        Depth = height_water_normal(self.FlowRate, 0.5, 0.001)
+        Distance, profile = cp.profile_rect(self.FlowRate, 0.5 * u.m,
+                                            2 * Depth * u.m, 0.001, 5 * u.m,
+                                            2000, 1e-6, 1 * u.mm)
+        self.assertEqual(Distance[-1], 10 * u.km)
+        self.assertTrue(np.all(np.diff(profile.magnitude, axis=0) <= 0))
+        np.testing.assert_allclose(profile[-1].magnitude, Depth, rtol=1e-4)
+
+    def test_supercritical(self):
+        """A supercritical flow should be marched downstream to normal depth."""
+        Depth = height_water_normal(self.FlowRate, 0.5, 0.05)
+        DepthCritical = pc.height_water_critical(self.FlowRate, 0.5).magnitude
+        self.assertTrue(np.all(Depth < DepthCritical))
+        Distance, profile = cp.profile_rect(self.FlowRate, 0.5,
+                                            0.99 * DepthCritical, 0.05, 1, 200,
+                                            1e-6, 0.001)
+        np.testing.assert_allclose(profile[-1].magnitude, Depth, rtol=1e-6)
+
+    def test_stream(self):
+        """The generator should yield one station at a time."""
+        stations = cp.profile_rect_stations(self.FlowRate, 0.5, 1, 0.001, 1,
+                                            10**9, 1e-6, 0.001)
+        Distance, Depth = next(stations)
+        self.assertEqual(Distance, 0 * u.m)
+        Distance, Depth = next(stations)
+        self.assertEqual(Distance, 1 * u.m)
+        self.assertEqual(Depth.shape, (3,))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+from aide_design.units import unit_registry as u
+from aide_design import conduction_line as cl
+from aide_design import physchem_kernels as pk
+from aide_design import pipedatabase as pipe
+import numpy as np
+import itertools
+import unittest
+
+
+class DesignConductionLineTest(unittest.TestCase):
+    """Test the least cost conduction line design."""
+    ND = np.array([1, 1.5, 2, 3, 4])[:, np.newaxis] * u.inch
+    SDR = np.array([26, 17])
+    CostPerLength = (ND.magnitude**1.5 * [1, 1.4]) * 3 * u.dollar/u.m
+    Length = np.array([300, 200, 400, 250]) * u.m
+    Elevation = np.array([150, 146, 120, 128, 40]) * u.m
+    hydraulics = (1e-6 * u.m**2/u.s, 0.01 * u.mm)
+
+    def design(self, **kwargs):
+        return cl.design_conduction_line(
+            2 * u.L/u.s, self.Length, self.Elevation, self.ND, self.SDR,
+            self.CostPerLength, *self.hydraulics, **kwargs)
+
+    def test_brute_force(self):
+        """The design should match the cheapest of all feasible designs."""
+        ND, SDR, HeadGrade, Cost = self.design(PressureHeadMin=1 * u.m,
+                                               HeadStep=1 * u.mm)
+        Elevation = self.Elevation.magnitude
+        Rating = cl._pressure_rating(self.SDR, cl.STRESS_DESIGN_PVC
+                                     .to(u.Pa).magnitude)
+        ID = np.array([[pipe.ID_SDR(nd, sdr).to(u.m).magnitude
+                        for sdr in self.SDR] for nd in self.ND[:, 0]])
+        HeadLoss = pk.headloss(2e-3, ID,
+                               self.Length.magnitude[:, np.newaxis, np.newaxis],
+                               1e-6, 1e-5, 0)
+        Costs = (self.CostPerLength
+                 * self.Length[:, np.newaxis, np.newaxis]).to(u.dollar).magnitude
+        options = list(itertools.product(range(5), range(2)))
+        CostMin = np.inf
+        for design in itertools.product(options, repeat=4):
+            Head, Total = Elevation[0], 0
+            for i, (d, s) in enumerate(design):
+                Head -= HeadLoss[i, d, s]
+                if (Head - Elevation[i + 1] < 1
+                        or Rating[s] < Elevation[0]
+                        - min(Elevation[i:i + 2])):
+                    break
+                Total += Costs[i, d, s]
+            else:
+                CostMin = min(CostMin, Total)
+        self.assertAlmostEqual(Cost.to(u.dollar).magnitude, CostMin, places=6)
+        self.assertTrue(np.all(HeadGrade[1:] - self.Elevation[1:]
+                               >= 1 * u.m))
+
+    def test_pressure_rating(self):
+        """Only the stronger pipe may be used where the static head is high."""
+        ND, SDR, HeadGrade, Cost = self.design(StressDesign=1500 * u.psi)
+        np.testing.assert_array_equal(SDR.magnitude, [26, 26, 26, 17])
+
+    def test_currency(self):
+        Cost = self.design()[3]
+        CostLempira = cl.design_conduction_line(
+            2 * u.L/u.s, self.Length, self.Elevation, self.ND, self.SDR,
+            self.CostPerLength.to(u.lempira/u.m), *self.hydraulics)[3]
+        self.assertAlmostEqual(Cost.magnitude, CostLempira.magnitude)
+
+    def test_infeasible(self):
+        self.assertRaises(ValueError, self.design, PressureHeadEnd=120 * u.m)
+
+
+if __name__ == '__main__':
+    unittest.main()
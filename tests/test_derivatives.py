@@ -0,0 +1,71 @@
+from aide_design import derivatives as dv
+from aide_design import physchem_kernels as pk
+import numpy as np
+import unittest
+
+
+def central_difference(func, args, index, step=1e-6):
+    """Return the central difference of func by its argument at index."""
+    high, low = list(args), list(args)
+    high[index] = args[index] * (1 + step)
+    low[index] = args[index] * (1 - step)
+    return (func(*high) - func(*low)) / (high[index] - low[index])
+
+
+class DerivativesTest(unittest.TestCase):
+    """Values should equal the kernels and slopes match finite differences."""
+    # Laminar, turbulent and rough turbulent pipes.
+    FlowRate = np.array([1e-6, 5e-3, 0.05])
+    Diam = np.array([0.05, 0.1, 0.3])
+
+    def test_headloss_grad(self):
+        for FricModel in (pk.FRIC_MODEL_SWAMEE, pk.FRIC_MODEL_COLEBROOK):
+            with self.subTest(FricModel=FricModel):
+                args = [self.FlowRate, self.Diam, 100., 1e-6, 1e-3, 2.]
+                result = dv.headloss_grad(*args, FricModel)
+                headloss = lambda *args: pk.headloss(*args, FricModel)
+                np.testing.assert_array_equal(result[0], headloss(*args))
+                for derivative, index in zip(result[1:], (0, 1, 2)):
+                    np.testing.assert_allclose(
+                        derivative, central_difference(headloss, args, index),
+                        rtol=1e-6)
+
+    def test_fric_grad(self):
+        args = [self.FlowRate, self.Diam, 1e-6, 1e-3]
+        result = dv.fric_grad(*args)
+        np.testing.assert_array_equal(result[0], pk.fric(*args))
+        for derivative, index in zip(result[1:], (0, 1)):
+            np.testing.assert_allclose(
+                derivative, central_difference(pk.fric, args, index),
+                rtol=1e-6)
+
+    def test_headloss_rect_grad(self):
+        for openchannel in (True, False):
+            with self.subTest(openchannel=openchannel):
+                args = [np.array([1e-5, 0.02, 0.5]), np.array([0.2, 0.4, 1]),
+                        np.array([0.1, 0.3, 0.8]), 10., 2., 1e-6, 1e-4,
+                        openchannel]
+                result = dv.headloss_rect_grad(*args)
+                np.testing.assert_array_equal(result[0],
+                                              pk.headloss_rect(*args))
+                for derivative, index in zip(result[1:], (0, 1, 2, 3)):
+                    np.testing.assert_allclose(
+                        derivative,
+                        central_difference(pk.headloss_rect, args, index),
+                        rtol=1e-6)
+
+    def test_flow_orifice_grad(self):
+        args = [np.array([0.01, 0.02, 0.05]), np.array([-0.1, 0.2, 1]), 0.62]
+        FlowRate, dDiam, dHeight = dv.flow_orifice_grad(*args)
+        np.testing.assert_array_equal(FlowRate, pk.flow_orifice(*args))
+        self.assertEqual(dDiam[0], 0)
+        self.assertEqual(dHeight[0], 0)
+        for derivative, index in ((dDiam, 0), (dHeight, 1)):
+            np.testing.assert_allclose(
+                derivative[1:],
+                central_difference(pk.flow_orifice, args, index)[1:],
+                rtol=1e-6)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,76 @@
+from aide_design.units import unit_registry as u
+from aide_design import elements as el
+from aide_design import physchem as pc
+from aide_design import physchem_kernels as pk
+import numpy as np
+import unittest
+
+
+class ElementsTest(unittest.TestCase):
+    """Each element should match its physchem function."""
+    FlowRate = np.array([0.5, 5, 20, 60]) * u.L/u.s
+    Nu = 1e-6 * u.m**2/u.s
+
+    def assertClose(self, actual, expected):
+        np.testing.assert_allclose(actual.to(u.m).magnitude,
+                                   expected.to(u.m).magnitude, rtol=1e-12)
+
+    def test_pipe(self):
+        pipe = el.Pipe(10 * u.cm, 100 * u.m, 0.1 * u.mm, KMinor=2)
+        self.assertClose(pipe.headloss(self.FlowRate, self.Nu),
+                         pc.headloss(self.FlowRate, 10 * u.cm, 100 * u.m,
+                                     self.Nu, 0.1 * u.mm, 2))
+        self.assertAlmostEqual(pipe.Area, np.pi / 400)
+
+    def test_rect_channel(self):
+        channel = el.RectChannel(0.5 * u.m, 0.3 * u.m, 20 * u.m, 1 * u.mm,
+                                 KMinor=1, openchannel=False)
+        self.assertClose(channel.headloss(self.FlowRate, self.Nu),
+                         pc.headloss_rect(self.FlowRate, 0.5 * u.m, 0.3 * u.m,
+                                          20 * u.m, 1, self.Nu, 1 * u.mm,
+                                          False))
+
+    def test_orifice_weir_sand_bed(self):
+        orifice = el.Orifice(2 * u.cm, NumOrifices=10)
+        self.assertClose(orifice.headloss(self.FlowRate),
+                         pc.head_orifice(2 * u.cm, pc.RATIO_VC_ORIFICE,
+                                         self.FlowRate / 10))
+        self.assertClose(el.Weir(1 * u.m).headloss(self.FlowRate),
+                         pc.headloss_weir(self.FlowRate, 1 * u.m))
+        bed = el.SandBed(20 * u.cm, 0.5 * u.m**2)
+        self.assertClose(bed.headloss(self.FlowRate, self.Nu),
+                         pc.headloss_kozeny(20 * u.cm, 0.5 * u.mm,
+                                            self.FlowRate / (0.5 * u.m**2),
+                                            0.4, self.Nu))
+
+    def test_slots(self):
+        pipe = el.Pipe(0.1, 10)
+        self.assertRaises(AttributeError, setattr, pipe, 'Color', 'blue')
+
+
+class SeriesTest(unittest.TestCase):
+    """A series should sum its elements' head losses in one pass."""
+    def test_series(self):
+        parts = [el.Pipe(0.1, 100, 1e-4, 2), el.Pipe(0.2, 50, 1e-4, 1),
+                 el.Pipe(0.1, 10, 1e-4, FricModel=pk.FRIC_MODEL_COLEBROOK),
+                 el.RectChannel(0.5, 0.3, 20, 1e-3),
+                 el.RectChannel(0.5, 0.3, 20, 1e-3, openchannel=False),
+                 el.Orifice(0.02, NumOrifices=50), el.Weir(1),
+                 el.SandBed(0.2, 0.5)]
+        system = parts[0] + el.Series(*parts[1:4]) + el.Series(*parts[4:])
+        self.assertEqual(system.elements, tuple(parts))
+        FlowRate = np.linspace(1e-3, 0.05, 1000).reshape(10, 100)
+        Nu = np.linspace(0.8e-6, 1.2e-6, 100)
+        expected = sum(part.headloss(FlowRate, Nu).magnitude
+                       for part in parts)
+        result = system.headloss(FlowRate, Nu)
+        self.assertEqual(result.shape, FlowRate.shape)
+        np.testing.assert_allclose(result.to(u.m).magnitude, expected,
+                                   rtol=1e-12)
+
+    def test_not_an_element(self):
+        self.assertRaises(TypeError, el.Series, el.Weir(1), 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,64 @@
+from aide_design import fusion
+from aide_design import physchem_kernels as pk
+import numpy as np
+import unittest
+
+
+class FuseTest(unittest.TestCase):
+    """Fused kernels should return exactly what the kernels return."""
+    rng = np.random.default_rng(1)
+    n = 1000
+    rect = (rng.uniform(1e-4, 1, n), rng.uniform(0.1, 2, n),
+            rng.uniform(0.1, 2, n), rng.uniform(1, 100, n),
+            rng.uniform(0, 3, n), 1e-6, rng.uniform(0, 1e-3, n))
+
+    def test_headloss_rect(self):
+        for openchannel in (True, False):
+            with self.subTest(openchannel=openchannel):
+                fused = fusion.fuse(pk.headloss_rect, openchannel=openchannel)
+                np.testing.assert_array_equal(
+                    fused(*self.rect), pk.headloss_rect(*self.rect,
+                                                        openchannel))
+        openchannel = self.rng.random(self.n) < 0.5
+        np.testing.assert_array_equal(
+            fusion.fuse('headloss_rect')(*self.rect, openchannel),
+            pk.headloss_rect(*self.rect, openchannel))
+
+    def test_scalars(self):
+        args = [np.asarray(arg).flat[0] for arg in self.rect]
+        self.assertAlmostEqual(
+            fusion.fuse(pk.headloss_rect, openchannel=True)(*args),
+            pk.headloss_rect(*args, True), places=15)
+
+    def test_common_subexpressions(self):
+        """The channel area and hydraulic radius should be computed once."""
+        source = fusion.fuse(pk.headloss_rect, openchannel=True).source
+        self.assertEqual(source.count('_multiply(Width, DistCenter)'), 1)
+        self.assertEqual(source.count('_add(Width,'), 1)
+
+    def test_inputs_unchanged(self):
+        """Reusing temporaries should never write to the inputs."""
+        args = [np.copy(arg) for arg in self.rect]
+        fusion.fuse(pk.headloss_rect, openchannel=True)(*args)
+        for arg, original in zip(args, self.rect):
+            np.testing.assert_array_equal(arg, original)
+
+    def test_branches(self):
+        """Each branch should only see the elements that select it."""
+        Height = np.array([-1, 0, 0.5, 2])
+        np.testing.assert_array_equal(
+            fusion.fuse(pk.flow_orifice)(0.1, Height, 0.6),
+            pk.flow_orifice(0.1, Height, 0.6))
+        FlowRate = np.array([1e-7, 1e-4, 0.1])
+        np.testing.assert_array_equal(
+            fusion.fuse(pk.headloss)(FlowRate, 0.1, 100, 1e-6, 1e-4, 2),
+            pk.headloss(FlowRate, 0.1, 100, 1e-6, 1e-4, 2))
+
+    def test_untraceable(self):
+        self.assertRaises(ValueError, fusion.fuse, pk.flow_pipe)
+        self.assertRaises(ValueError, fusion.fuse, pk.fric,
+                          FricModel=pk.FRIC_MODEL_COLEBROOK)
+
+
+if __name__ == '__main__':
+    unittest.main()
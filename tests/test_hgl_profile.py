@@ -0,0 +1,97 @@
+from aide_design.units import unit_registry as u
+from aide_design import hgl_profile as hgl
+from aide_design import physchem as pc
+import numpy as np
+import os
+import tempfile
+import unittest
+
+
+class HglProfileTest(unittest.TestCase):
+    """Test the streaming hydraulic grade line."""
+    Distance = np.linspace(0, 3000, 3001)
+    Elevation = 100 - 0.02 * Distance + 4 * np.sin(Distance / 200)
+    KMinor = np.where(Distance % 500 == 0, 0.9, 0)
+    profile = np.column_stack((Distance, Elevation, KMinor))
+    args = (3 * u.L/u.s, 3 * u.inch, 1e-6 * u.m**2/u.s, 0.01 * u.mm)
+
+    def stream(self, Chunks, **kwargs):
+        results = list(hgl.hgl_profile_stream(Chunks, *self.args, **kwargs))
+        return [np.concatenate([np.asarray(getattr(r[i], 'magnitude', r[i]))
+                                for r in results]) for i in range(4)]
+
+    def test_straight_line(self):
+        """A straight line should lose head at the physchem rates."""
+        Distance, HeadGrade, PressureHead, Alert = self.stream(
+            [np.column_stack(([0, 40, 100], [50, 20, 20], [0, 2, 0]))])
+        Length = np.hypot(40, 30) + 60
+        self.assertAlmostEqual(
+            50 - HeadGrade[-1],
+            (pc.headloss_fric(self.args[0], self.args[1], Length * u.m,
+                              *self.args[2:])
+             + pc.headloss_exp(self.args[0], self.args[1], 2)
+             ).to(u.m).magnitude, places=12)
+        np.testing.assert_array_equal(PressureHead, HeadGrade - [50, 20, 20])
+
+    def test_chunks(self):
+        """The chunk size should not change the result."""
+        whole = self.stream([self.profile])
+        chunked = self.stream(self.profile[i:i + 7]
+                              for i in range(0, len(self.profile), 7))
+        for a, b in zip(whole, chunked):
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+    def test_alerts(self):
+        Distance, HeadGrade, PressureHead, Alert = self.stream(
+            [self.profile], PressureHeadMin=5 * u.m)
+        np.testing.assert_array_equal(
+            Alert, np.where(PressureHead < 0, hgl.ALERT_NEGATIVE_PRESSURE,
+                            np.where(PressureHead < 5, hgl.ALERT_LOW_PRESSURE,
+                                     hgl.ALERT_NONE)))
+        self.assertTrue(np.any(Alert == hgl.ALERT_NEGATIVE_PRESSURE))
+        Lowest, DistanceLowest, NumLow, NumNegative = hgl.hgl_profile_summary(
+            [self.profile], *self.args, PressureHeadMin=5 * u.m)
+        self.assertEqual(Lowest.magnitude, PressureHead.min())
+        self.assertEqual(DistanceLowest.magnitude,
+                         Distance[PressureHead.argmin()])
+        self.assertEqual(NumLow, np.count_nonzero(Alert == 1))
+        self.assertEqual(NumNegative, np.count_nonzero(Alert == 2))
+
+    def test_readers(self):
+        """Profiles read from CSV and .npy files should match the array."""
+        whole = self.stream([self.profile])
+        with tempfile.TemporaryDirectory() as directory:
+            csv = os.path.join(directory, 'profile.csv')
+            npy = os.path.join(directory, 'profile.npy')
+            np.savetxt(csv, self.profile, delimiter=',', fmt='%.17g',
+                       header='distance,elevation,kminor', comments='')
+            np.save(npy, self.profile)
+            for Chunks in (hgl.read_profile_csv(csv, 1000),
+                           hgl.read_profile_npy(npy, 1000)):
+                for a, b in zip(whole, self.stream(Chunks)):
+                    np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+    def test_units(self):
+        """Profiles surveyed in feet should be converted."""
+        feet = self.stream([self.profile / [0.3048, 0.3048, 1]],
+                           LengthUnit=u.ft)
+        for a, b in zip(self.stream([self.profile]), feet):
+            np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+
+    def test_units_heads(self):
+        """Plain-number heads should be read in LengthUnit."""
+        metres = self.stream([self.profile], HeadSource=103 * u.m,
+                             PressureHeadMin=5 * u.m)
+        for HeadSource, PressureHeadMin in ((103 / 0.3048, 5 / 0.3048),
+                                            (103 * u.m, 5 * u.m)):
+            feet = self.stream([self.profile / [0.3048, 0.3048, 1]],
+                               HeadSource=HeadSource,
+                               PressureHeadMin=PressureHeadMin,
+                               LengthUnit=u.ft)
+            for a, b in zip(metres, feet):
+                np.testing.assert_allclose(a, b, rtol=0, atol=1e-9)
+            self.assertTrue(np.any(feet[3] == hgl.ALERT_LOW_PRESSURE))
+
+
+if __name__ == '__main__':
+    unittest.main()
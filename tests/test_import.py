@@ -0,0 +1,50 @@
+# -*- coding: utf-8 -*-
+"""
+Tests that the package imports with the pinned pint version.
+
+pint checks at import time that each @u.wraps unit list has one entry per
+parameter of the function it wraps, so a parameter added without a unit
+breaks the whole module.
+"""
+
+import ast
+import importlib
+import inspect
+import unittest
+
+
+MODULES = ['units', 'utility', 'physchem_kernels', 'physchem',
+           'water_properties', 'pipedatabase', 'solvers', 'network',
+           'manifold', 'channel_profile', 'operating_point',
+           'conduction_line', 'hgl_profile', 'water_hammer', 'sand_bed',
+           'fusion', 'parallel', 'jit', 'derivatives', 'uncertainty',
+           'sweep', 'elements']
+
+
+class ImportTest(unittest.TestCase):
+    """Test that every module imports and its unit lists fit."""
+    def test_import(self):
+        for name in MODULES:
+            with self.subTest(module=name):
+                importlib.import_module('aide_design.' + name)
+
+    def test_wraps_lengths(self):
+        for name in MODULES:
+            module = importlib.import_module('aide_design.' + name)
+            tree = ast.parse(inspect.getsource(module))
+            for node in ast.walk(tree):
+                if not isinstance(node, ast.FunctionDef):
+                    continue
+                for deco in node.decorator_list:
+                    if not (isinstance(deco, ast.Call)
+                            and getattr(deco.func, 'attr', '') == 'wraps'
+                            and len(deco.args) > 1
+                            and isinstance(deco.args[1], ast.List)):
+                        continue
+                    with self.subTest(module=name, func=node.name):
+                        self.assertEqual(len(deco.args[1].elts),
+                                         len(node.args.args))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,52 @@
+from aide_design import jit
+from aide_design import physchem_kernels as pk
+import numpy as np
+import unittest
+
+
+class JitTest(unittest.TestCase):
+    """The JIT loops should agree with the kernels, with or without numba."""
+    rng = np.random.default_rng(3)
+    n = 500
+    Diam = rng.uniform(0.01, 0.5, n)
+    HeadLoss = rng.uniform(0.01, 10, n)
+    Length = rng.uniform(1, 1000, n)
+    PipeRough = rng.uniform(0, 1e-3, n)
+    KMinor = np.where(rng.random(n) < 0.2, 0, rng.uniform(0, 20, n))
+
+    def test_flow_pipe(self):
+        for FricModel in (pk.FRIC_MODEL_SWAMEE, pk.FRIC_MODEL_COLEBROOK):
+            with self.subTest(FricModel=FricModel):
+                args = (self.Diam, self.HeadLoss, self.Length, 1e-6,
+                        self.PipeRough, self.KMinor, FricModel)
+                FlowRate, Iterations, converged = jit.flow_pipe_batch(*args)
+                expected = pk.flow_pipe_batch(*args)
+                np.testing.assert_allclose(FlowRate, expected[0], rtol=1e-9)
+                self.assertLessEqual(
+                    np.abs(Iterations - expected[1]).max(), 1)
+                self.assertTrue(converged.all())
+        self.assertAlmostEqual(
+            jit.flow_pipe(0.1, 1, 100, 1e-6, 1e-4, 2),
+            pk.flow_pipe(0.1, 1, 100, 1e-6, 1e-4, 2), places=12)
+
+    def test_diam_pipe(self):
+        FlowRate = self.rng.uniform(1e-5, 0.1, self.n)
+        args = (FlowRate, self.HeadLoss, self.Length, 1e-6, self.PipeRough,
+                self.KMinor)
+        np.testing.assert_allclose(jit.diam_pipe(*args), pk.diam_pipe(*args),
+                                   rtol=1e-9)
+        self.assertEqual(np.ndim(jit.diam_pipe(0.01, 1, 100, 1e-6, 1e-4, 2)),
+                         0)
+
+    def test_lfom_orifice_counts(self):
+        """Each row makes up the flow that the rows below it miss."""
+        counts = jit.lfom_orifice_counts([1, 2, 3.4], [1, 0.6, 0.2], 2)
+        np.testing.assert_array_equal(counts, [1, 1, 2])
+
+    def test_unknown_model(self):
+        self.assertRaises(ValueError, jit.flow_pipe_batch, 0.1, 1, 100, 1e-6,
+                          1e-4, 2, FricModel='manning')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import manifold as mf
+import numpy as np
+import unittest
+
+
+class ManifoldTest(unittest.TestCase):
+    """Test the per-port manifold flow distribution."""
+    args = (10 * u.L/u.s, 4 * u.inch, 6 * u.m, 50, exp.DIAM_SED_MANIFOLD_PORT,
+            1e-6 * u.m**2/u.s, 0.01 * u.mm)
+
+    def test_flow_manifold_ports(self):
+        PortFlow, RatioFlow = mf.flow_manifold_ports(*self.args)
+        self.assertEqual(PortFlow.shape, (50,))
+        self.assertAlmostEqual(PortFlow.sum().to(u.L/u.s).magnitude, 10,
+                               places=9)
+        # Pressure recovery pushes more flow out of the far ports.
+        self.assertGreater(PortFlow[-1], 4 * PortFlow[0])
+        self.assertAlmostEqual(RatioFlow.magnitude,
+                               (PortFlow.min() / PortFlow.max()).magnitude)
+
+    def test_combining(self):
+        """A launder draws the most flow through the ports near its exit."""
+        PortFlow, RatioFlow = mf.flow_manifold_ports(
+            *self.args, PressureRecovery=mf.PRESSURE_RECOVERY_COMBINING)
+        self.assertTrue(np.all(np.diff(PortFlow.magnitude) < 0))
+        self.assertLess(RatioFlow, mf.flow_manifold_ports(*self.args)[1])
+
+    def test_batch(self):
+        """A batch should match single calls, padding the shorter manifolds."""
+        NumPorts = np.array([50, 120])
+        DiamPort = np.array([1, 2])[:, np.newaxis] * u.cm
+        PortFlow, RatioFlow = mf.flow_manifold_ports(
+            10 * u.L/u.s, 4 * u.inch, 6 * u.m, NumPorts, DiamPort,
+            1e-6 * u.m**2/u.s, 0.01 * u.mm)
+        self.assertEqual(PortFlow.shape, (2, 2, 120))
+        single = mf.flow_manifold_ports(10 * u.L/u.s, 4 * u.inch, 6 * u.m, 50,
+                                        2 * u.cm, 1e-6 * u.m**2/u.s,
+                                        0.01 * u.mm)
+        np.testing.assert_allclose(PortFlow[1, 0, :50].magnitude,
+                                   single[0].magnitude, rtol=1e-8)
+        np.testing.assert_array_equal(PortFlow[1, 0, 50:].magnitude, 0)
+        self.assertAlmostEqual(RatioFlow[1, 0].magnitude,
+                               single[1].magnitude, places=8)
+
+
+if __name__ == '__main__':
+    unittest.main()
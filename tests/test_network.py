@@ -0,0 +1,47 @@
+from aide_design.units import unit_registry as u
+from aide_design import physchem as pc
+from aide_design import network as nw
+import numpy as np
+import unittest
+
+
+class PipeNetworkTest(unittest.TestCase):
+    """Test the global gradient network solver."""
+    def test_single_pipe(self):
+        """One pipe between two reservoirs should lose the head difference."""
+        network = nw.PipeNetwork([0], [1], [0, 1], 10 * u.cm, 100 * u.m,
+                                 0.1 * u.mm, KMinor=2)
+        FlowRate, Head, iterations = network.solve([10, 8] * u.m)
+        self.assertAlmostEqual(pc.headloss(FlowRate[0], 10 * u.cm, 100 * u.m,
+                                           1e-6, 0.1 * u.mm, 2).magnitude,
+                               2, places=7)
+
+    def test_looped_network(self):
+        """Flows should satisfy continuity and the head loss in every pipe."""
+        # A reservoir (node 4) feeding a square loop of four junctions.
+        StartNode = [4, 0, 1, 2, 0, 1]
+        EndNode = [0, 1, 2, 3, 3, 3]
+        Diam = np.array([0.3, 0.2, 0.15, 0.1, 0.2, 0.1])
+        Demand = np.array([0.01, 0.02, 0.015, 0.03, 0])
+        network = nw.PipeNetwork(StartNode, EndNode, [4], Diam, 200, 1e-4,
+                                 KMinor=1)
+        FlowRate, Head, iterations = network.solve([50], Demand)
+        FlowRate, Head = FlowRate.magnitude, Head.magnitude
+        inflow = (np.bincount(EndNode, FlowRate, 5)
+                  - np.bincount(StartNode, FlowRate, 5))
+        np.testing.assert_allclose(inflow[:4], Demand[:4], atol=1e-15)
+        headloss = pc.headloss(np.abs(FlowRate), Diam, 200, 1e-6, 1e-4,
+                               1).magnitude
+        np.testing.assert_allclose(np.sign(FlowRate) * headloss,
+                                   Head[StartNode] - Head[EndNode], rtol=1e-7)
+        # A new solve reuses the structure and starts from this solution.
+        FlowRate, Head, iterations = network.solve([50], Demand)
+        self.assertEqual(iterations, 1)
+
+    def test_no_convergence(self):
+        network = nw.PipeNetwork([2, 0], [0, 1], [2], 0.1, 100, 1e-4)
+        self.assertRaises(RuntimeError, network.solve, [10], 0.01, MaxIter=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import operating_point as op
+from aide_design import physchem as pc
+import numpy as np
+import unittest
+
+
+class FlowOperatingPointTest(unittest.TestCase):
+    """Test the pump curve and system curve intersections."""
+    FlowPump = np.array([0, 2, 4, 6, 8, 10]) * u.L/u.s
+    HeadPump = np.array([30, 29, 27, 23.5, 18, 10]) * u.m
+    KMinor = (exp.K_MINOR_PIPE_ENTRANCE + 4 * exp.K_MINOR_EL90
+              + exp.K_MINOR_GATE_VALVE + exp.K_MINOR_PIPE_EXIT)
+    system = (2 * u.inch, 100 * u.m, 1e-6 * u.m**2/u.s, 0.01 * u.mm, KMinor)
+
+    def test_operating_point(self):
+        FlowRate, Head, converged = op.flow_operating_point(
+            self.FlowPump, self.HeadPump, 5 * u.m, *self.system)
+        self.assertTrue(converged)
+        self.assertAlmostEqual(
+            (Head - 5 * u.m).to(u.m).magnitude,
+            pc.headloss(FlowRate, *self.system).to(u.m).magnitude, places=9)
+        self.assertAlmostEqual(
+            Head.to(u.m).magnitude,
+            np.interp(FlowRate.to(u.L/u.s).magnitude,
+                      self.FlowPump.magnitude, self.HeadPump.magnitude),
+            places=9)
+
+    def test_batch(self):
+        """Every pump × diameter × static head should match single calls."""
+        FlowPump = np.stack([self.FlowPump.magnitude,
+                             2 * self.FlowPump.magnitude]) * u.L/u.s
+        HeadPump = np.stack([self.HeadPump.magnitude,
+                             0.8 * self.HeadPump.magnitude]) * u.m
+        Diam = np.array([1.5, 2, 3, 4]) * u.inch
+        HeadStatic = np.array([0, 5, 12]) * u.m
+        FlowRate, Head, converged = op.flow_operating_point(
+            FlowPump[:, np.newaxis, np.newaxis], HeadPump[:, np.newaxis,
+                                                          np.newaxis],
+            HeadStatic, Diam[:, np.newaxis], *self.system[1:])
+        self.assertEqual(FlowRate.shape, (2, 4, 3))
+        for pump in range(2):
+            for i, D in enumerate(Diam):
+                for j, H in enumerate(HeadStatic):
+                    with self.subTest(pump=pump, Diam=D, HeadStatic=H):
+                        single = op.flow_operating_point(
+                            FlowPump[pump], HeadPump[pump], H, D,
+                            *self.system[1:])
+                        self.assertEqual(converged[pump, i, j], single[2])
+                        if single[2]:
+                            self.assertEqual(FlowRate[pump, i, j], single[0])
+
+    def test_no_operating_point(self):
+        """No flow above the shutoff head, or past the end of the curve."""
+        FlowRate, Head, converged = op.flow_operating_point(
+            self.FlowPump, self.HeadPump, np.array([40, 5, -100]) * u.m,
+            *self.system)
+        np.testing.assert_array_equal(converged, [False, True, False])
+        self.assertTrue(np.isnan(FlowRate[[0, 2]].magnitude).all())
+
+    def test_source(self):
+        """A fixed source elevation should use all of its head on the pipe."""
+        FlowRate, Head, converged = op.flow_operating_point(
+            [0, 1], [8, 8], 0, *self.system)
+        self.assertTrue(converged)
+        self.assertAlmostEqual(
+            pc.headloss(FlowRate, *self.system).to(u.m).magnitude, 8,
+            places=9)
+
+    def test_bad_curve(self):
+        self.assertRaises(ValueError, op.flow_operating_point, [0, 2, 1],
+                          [3, 2, 1], 0, *self.system)
+        self.assertRaises(ValueError, op.flow_operating_point, [0], [3], 0,
+                          *self.system)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+from aide_design.units import unit_registry as u
+from aide_design import parallel
+from aide_design import physchem as pc
+from aide_design import physchem_kernels as pk
+import numpy as np
+import pickle
+import unittest
+
+
+def design(FlowRate, Diam, KMinor=2):
+    """Return the minor loss and the diameter, as a worker process would."""
+    return pc.headloss_exp(FlowRate, Diam, KMinor), Diam
+
+
+class EvaluateTest(unittest.TestCase):
+    """Threaded results should equal the direct results exactly."""
+    rng = np.random.default_rng(2)
+    FlowRate = rng.uniform(1e-5, 0.1, 300001)
+
+    def test_kernel(self):
+        args = (self.FlowRate, 0.1, 100, 1e-6, 1e-4, 2)
+        np.testing.assert_array_equal(
+            parallel.evaluate(pk.headloss, *args, Threads=4, MinSize=0),
+            pk.headloss(*args))
+
+    def test_broadcast_tuple(self):
+        """Inputs broadcast along both axes and tuples are assembled."""
+        FlowRate = self.FlowRate[:3000].reshape(-1, 1)
+        Diam = np.linspace(0.05, 0.5, 40)
+        result = parallel.evaluate(pk.fric_batch, FlowRate, Diam, 1e-6,
+                                   1e-4, FricModel=pk.FRIC_MODEL_COLEBROOK,
+                                   Threads=3, MinSize=0)
+        expected = pk.fric_batch(FlowRate, Diam, 1e-6, 1e-4,
+                                 pk.FRIC_MODEL_COLEBROOK)
+        for item, expectedItem in zip(result, expected):
+            self.assertEqual(item.dtype, expectedItem.dtype)
+            np.testing.assert_array_equal(item, expectedItem)
+
+    def test_quantities(self):
+        result = parallel.evaluate(pc.headloss_exp, self.FlowRate * u.m**3/u.s,
+                                   10 * u.cm, 2, Threads=4, MinSize=0)
+        expected = pc.headloss_exp(self.FlowRate * u.m**3/u.s, 10 * u.cm, 2)
+        self.assertEqual(result.units, expected.units)
+        np.testing.assert_array_equal(result.magnitude, expected.magnitude)
+
+    def test_settings(self):
+        """Small inputs and the default settings take the direct path."""
+        calls = []
+
+        def count(x):
+            calls.append(np.size(x))
+            return x * 2
+
+        parallel.evaluate(count, np.arange(10), Threads=4, MinSize=100)
+        parallel.evaluate(count, self.FlowRate)
+        self.assertEqual(calls, [10, self.FlowRate.size])
+        previous = parallel.set_threads(2, MinSize=0)
+        try:
+            doubled = parallel.threaded(count)(self.FlowRate)
+        finally:
+            parallel.set_threads(*previous)
+        self.assertGreater(len(calls), 3)
+        np.testing.assert_array_equal(doubled, self.FlowRate * 2)
+
+
+class MapTest(unittest.TestCase):
+    """Quantities should cross process boundaries in a usable state."""
+    def test_map(self):
+        FlowRates = [1, 5, 10] * u.L/u.s
+        results = parallel.map(design, FlowRates, [10 * u.cm] * 3,
+                               Processes=2, KMinor=3)
+        for FlowRate, (HeadLoss, Diam) in zip(FlowRates, results):
+            # The results work with quantities of this process's registry.
+            self.assertEqual(Diam + 1 * u.cm, 11 * u.cm)
+            self.assertAlmostEqual(
+                (HeadLoss - pc.headloss_exp(FlowRate, 10 * u.cm, 3)).to(u.m)
+                .magnitude, 0)
+
+    def test_pack(self):
+        value = {'a': (1 * u.m, [2 * u.s]), 'b': 3}
+        packed = parallel._pack(value)
+        self.assertEqual(parallel._unpack(pickle.loads(pickle.dumps(packed))),
+                         value)
+
+    def test_pickle(self):
+        """Plain pickling rebuilds quantities in the unit registry."""
+        self.assertEqual(pickle.loads(pickle.dumps(5 * u.L/u.s)) + 1 * u.L/u.s,
+                         6 * u.L/u.s)
+
+
+if __name__ == '__main__':
+    unittest.main()
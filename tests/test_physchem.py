@@ -13,6 +13,7 @@ By: Ethan Keller
 
 from aide_design.units import unit_registry as u
 from aide_design import physchem as pc
+import numpy as np
 import unittest
 
 class GeometryTest(unittest.TestCase):
@@ -663,7 +664,8 @@ class OrificeFuncsTest(unittest.TestCase):
                   ([0.3, 4, 0.67], 0.41946278400781861), ([2, -4, 0.2], 0))
         for i in checks:
             with self.subTest(i=i):
-                self.assertEqual(pc.flow_orifice_vert(*i[0]).magnitude, i[1])
+                self.assertAlmostEqual(pc.flow_orifice_vert(*i[0]).magnitude,
+                                       i[1], places=12)
     
     def test_flow_orifice_vert_range(self):
         """flow_orifice_vert should raise errors when inputs are out of bounds."""
@@ -919,6 +921,23 @@ class FlowFuncsTest(unittest.TestCase):
         for i in checks:
             with self.subTest(i=i):
                 self.assertEqual(pc.flow_pipe(*i).magnitude, base)
+
+    def test_flow_pipe_2d(self):
+        """flow_pipe should accept and check 2-D array inputs."""
+        Diam = np.array([[0.25, 0.1], [0.05, 0.25]])
+        HeadLoss = np.array([[0.4], [2]])
+        FlowRate = pc.flow_pipe(Diam, HeadLoss, 2, 0.58, 0.029, 0.35)
+        self.assertEqual(FlowRate.shape, (2, 2))
+        for i in range(2):
+            for j in range(2):
+                with self.subTest(i=i, j=j):
+                    self.assertAlmostEqual(
+                        FlowRate[i, j].magnitude,
+                        pc.flow_pipe(Diam[i, j], HeadLoss[i, 0], 2, 0.58,
+                                     0.029, 0.35).magnitude, places=12)
+        Diam[1, 0] = 0
+        with self.assertRaises(ValueError):
+            pc.flow_pipe(Diam, HeadLoss, 2, 0.58, 0.029, 0.35)
     
 
 class DiamFuncsTest(unittest.TestCase):
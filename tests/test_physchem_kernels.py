@@ -0,0 +1,194 @@
+from aide_design.units import unit_registry as u
+from aide_design import physchem as pc
+from aide_design import physchem_kernels as pk
+import numpy as np
+import unittest
+
+
+class KernelsMatchPhyschemTest(unittest.TestCase):
+    """The kernels should return the magnitudes of the physchem functions."""
+    def test_headloss(self):
+        checks = ([100, 2, 4, 0.001, 1, 2],
+                  [0.001, 0.05, 30, 1e-6, 0.0001, 1.5],
+                  [55, 0.4, 2, 0.5, 0.0001, 0.12])
+        for i in checks:
+            with self.subTest(i=i):
+                self.assertEqual(pk.headloss(*i), pc.headloss(*i).magnitude)
+
+    def test_headloss_rect(self):
+        checks = ([0.06, 3, 0.2, 4, 1, 0.5, 0.006, True],
+                  [0.06, 3, 0.2, 4, 1, 1e-6, 0.006, False])
+        for i in checks:
+            with self.subTest(i=i):
+                self.assertEqual(pk.headloss_rect(*i),
+                                 pc.headloss_rect(*i).magnitude)
+
+    def test_flow_pipe(self):
+        checks = ([0.1, 2, 100, 1e-6, 0.0001, 2],
+                  [0.4, 0.6, 25, 0.0007, 0.0002, 0])
+        for i in checks:
+            with self.subTest(i=i):
+                self.assertEqual(pk.flow_pipe(*i), pc.flow_pipe(*i).magnitude)
+
+
+class KernelsArrayTest(unittest.TestCase):
+    """The kernels should broadcast over arrays element by element."""
+    def test_fric_array(self):
+        FlowRate = np.array([1e-5, 1e-3, 0.1, 2])
+        result = pk.fric(FlowRate, 0.1, 1e-6, 0.0001)
+        for flow, f in zip(FlowRate, result):
+            with self.subTest(flow=flow):
+                self.assertAlmostEqual(f, pc.fric(flow, 0.1, 1e-6, 0.0001),
+                                       places=14)
+
+    def test_radius_hydraulic_array(self):
+        result = pk.radius_hydraulic(np.array([10, 10]), 4,
+                                     np.array([False, True]))
+        np.testing.assert_allclose(result, [1.4285714285714286,
+                                            2.2222222222222223])
+
+    def test_flow_orifice_array(self):
+        result = pk.flow_orifice(0.4, np.array([-1, 0, 2]), 0.46)
+        np.testing.assert_allclose(result, [0, 0, 0.36204122788069698])
+
+    def test_headloss_units_boundary(self):
+        """Converting once at the boundary should match the kernel."""
+        FlowRate = np.linspace(1, 10, 5) * u.L/u.s
+        result = pc.headloss(FlowRate, 10 * u.cm, 50 * u.m,
+                             1e-6 * u.m**2/u.s, 0.1 * u.mm, 2)
+        expected = pk.headloss(FlowRate.to(u.m**3/u.s).magnitude, 0.1, 50,
+                               1e-6, 0.0001, 2)
+        np.testing.assert_allclose(result.to(u.m).magnitude, expected)
+
+
+class FricBatchTest(unittest.TestCase):
+    """Test the batched friction factor engine."""
+    def test_fric_batch(self):
+        FlowRate = np.array([1e-6, 1e-5, 0.1, 2])
+        f, Re, regime = pk.fric_batch(FlowRate, 0.1, 1e-6, 0.0001)
+        np.testing.assert_allclose(f, pk.fric(FlowRate, 0.1, 1e-6, 0.0001))
+        np.testing.assert_allclose(Re, pk.re_pipe(FlowRate, 0.1, 1e-6))
+        np.testing.assert_array_equal(regime, [pk.REGIME_LAMINAR] * 2
+                                      + [pk.REGIME_TURBULENT] * 2)
+
+    def test_fric_rect_batch(self):
+        Nu = np.array([0.5, 1e-6])
+        openchannel = np.array([True, False])
+        f, Re, regime = pk.fric_rect_batch(0.06, 3, 0.2, Nu, 0.006, openchannel)
+        np.testing.assert_allclose(f, pk.fric_rect(0.06, 3, 0.2, Nu, 0.006,
+                                                   openchannel))
+        np.testing.assert_allclose(Re, pk.re_rect(0.06, 3, 0.2, Nu,
+                                                  openchannel))
+        np.testing.assert_array_equal(regime, [pk.REGIME_LAMINAR,
+                                               pk.REGIME_TURBULENT])
+
+    def test_fric_general_batch(self):
+        f, Re, regime = pk.fric_general_batch(120, 0.6, np.array([12, 1e-5]),
+                                              0.3, 0.002)
+        self.assertAlmostEqual(f[0], 0.023024557179148988, places=14)
+        self.assertEqual(regime[1], pk.REGIME_LAMINAR)
+        self.assertEqual(f[1], 64 / Re[1])
+
+
+class ColebrookTest(unittest.TestCase):
+    """Test the Colebrook-White friction model."""
+    def test_colebrook_residual(self):
+        """The solution should satisfy the Colebrook-White equation."""
+        Re = np.logspace(np.log10(2100), 8, 2000)
+        Rough = np.linspace(0, 0.05, 2000)[:, np.newaxis]
+        f = pk._fric_colebrook(Re, Rough / 3.7)
+        residual = (1 / np.sqrt(f)
+                    + 2 * np.log10(Rough / 3.7 + 2.51 / (Re * np.sqrt(f))))
+        self.assertLess(np.max(np.abs(residual) * np.sqrt(f)), 1e-13)
+
+    def test_colebrook_selectable(self):
+        """headloss_fric and flow_pipe should accept the Colebrook model."""
+        args = (0.01, 0.1, 100, 1e-6, 0.0001)
+        swamee = pc.headloss_fric(*args).magnitude
+        colebrook = pc.headloss_fric(*args, FricModel="colebrook").magnitude
+        self.assertNotEqual(swamee, colebrook)
+        self.assertAlmostEqual(colebrook / swamee, 1, places=1)
+        self.assertRaises(ValueError, pc.headloss_fric, *args,
+                          FricModel="moody")
+
+    def test_colebrook_flow_pipe_inverts_headloss(self):
+        """flow_swamee is the exact inverse of Colebrook-White."""
+        FlowRate = pk.flow_pipe(0.1, 2, 100, 1e-6, 0.0001, 0,
+                                FricModel=pk.FRIC_MODEL_COLEBROOK)
+        self.assertAlmostEqual(pk.headloss_fric(FlowRate, 0.1, 100, 1e-6,
+                                                0.0001, pk.FRIC_MODEL_COLEBROOK),
+                               2, places=9)
+
+    def test_colebrook_batch_laminar(self):
+        """Laminar elements should keep 64/Re under either model."""
+        f, Re, regime = pk.fric_batch(np.array([1e-6, 0.1]), 0.1, 1e-6, 0.0001,
+                                      pk.FRIC_MODEL_COLEBROOK)
+        self.assertEqual(f[0], 64 / Re[0])
+        self.assertEqual(regime[1], pk.REGIME_TURBULENT)
+
+
+class FlowOrificeVertTest(unittest.TestCase):
+    """Test the Gauss-Legendre vertical orifice flow."""
+    def test_matches_quad(self):
+        """The flow should be within 1e-12 of a tightly converged quad."""
+        from scipy import integrate
+        Diam = 0.3
+        for Height in (-0.149, -0.1, 0, 0.1, 0.16, 0.5, 4):
+            with self.subTest(Height=Height):
+                r = Diam / 2
+                expected = integrate.quad(
+                    lambda z: Diam * np.sqrt(1 - (z/r)**2) * np.sqrt(Height - z),
+                    -r, min(Height, r), epsabs=0, epsrel=1e-13, limit=200)[0]
+                expected *= 0.67 * np.sqrt(2 * pk.GRAVITY)
+                self.assertLess(abs(pk.flow_orifice_vert(Diam, Height, 0.67)
+                                    / expected - 1), 1e-12)
+
+    def test_array(self):
+        """Arrays should broadcast element by element."""
+        Height = np.array([[-4, 0.5], [3, 4]])
+        result = pk.flow_orifice_vert(np.array([2, 0.3]), Height, 0.4)
+        self.assertEqual(result.shape, (2, 2))
+        self.assertEqual(result[0, 0], 0)
+        self.assertAlmostEqual(result[1, 1],
+                               pk.flow_orifice_vert(0.3, 4, 0.4), places=15)
+
+
+class FlowPipeBatchTest(unittest.TestCase):
+    """Test the array-native flow_pipe solver."""
+    def test_matches_scalar(self):
+        """Each element should match the scalar fixed-point loop."""
+        Diam = np.array([0.1, 0.4, 0.05, 0.3])
+        HeadLoss = np.array([2, 0.6, 10, 0])
+        KMinor = np.array([2, 0, 5, 1])
+        FlowRate, Iterations, converged = pk.flow_pipe_batch(
+            Diam, HeadLoss, 100, 1e-6, 0.0001, KMinor)
+        for i in range(len(Diam)):
+            with self.subTest(i=i):
+                self.assertAlmostEqual(FlowRate[i], pk.flow_pipe(
+                    Diam[i], HeadLoss[i], 100, 1e-6, 0.0001, KMinor[i]),
+                    places=14)
+        np.testing.assert_array_equal(Iterations == 0,
+                                      [False, True, False, True])
+        self.assertTrue(converged.all())
+
+    def test_broadcast(self):
+        """The inputs should broadcast, and flow_pipe should accept arrays."""
+        HeadLoss = np.linspace(0.1, 5, 6)[:, np.newaxis]
+        Diam = np.array([0.05, 0.1, 0.2])
+        FlowRate, Iterations, converged = pk.flow_pipe_batch(
+            Diam, HeadLoss, 50, 1e-6, 0.0001, 3)
+        self.assertEqual(FlowRate.shape, (6, 3))
+        np.testing.assert_array_equal(
+            pc.flow_pipe(Diam, HeadLoss, 50, 1e-6, 0.0001, 3).magnitude,
+            FlowRate)
+
+    def test_max_iter(self):
+        """Elements still moving after MaxIter should be reported."""
+        FlowRate, Iterations, converged = pk.flow_pipe_batch(
+            0.1, 2, 100, 1e-6, 0.0001, 2, MaxIter=1)
+        self.assertEqual(Iterations, 1)
+        self.assertFalse(converged)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,8 @@
 import unittest
 from aide_design.units import unit_registry as u
 from aide_design import pipedatabase as pipe
+from aide_design import physchem as pc
+import numpy as np
 
 class PipeTest(unittest.TestCase):
     def test_OD(self):
@@ -9,5 +11,31 @@ class PipeTest(unittest.TestCase):
             with self.subTest(i=i):
                 self.assertEqual(pipe.OD(i[0]), i[1])
 
+    def test_ND_SDR_headloss(self):
+        FlowRate = np.array([1, 5, 20, 1e5]) * u.L/u.s
+        ND = pipe.ND_SDR_headloss(FlowRate, 2 * u.m, 200 * u.m,
+                                  1e-6 * u.m**2/u.s, 0.01 * u.mm, 2, 26)
+        for i in range(3):
+            with self.subTest(i=i):
+                ID = pc.diam_pipe(FlowRate[i], 2 * u.m, 200 * u.m,
+                                  1e-6 * u.m**2/u.s, 0.01 * u.mm, 2)
+                self.assertEqual(ND[i], pipe.ND_SDR_available(ID, 26))
+        self.assertTrue(np.isnan(ND[3].magnitude))
+
+    def test_ND_SDR_headloss_2d(self):
+        FlowRate = np.array([[1, 5], [20, 1]]) * u.L/u.s
+        HeadLoss = np.array([[2], [1]]) * u.m
+        ND = pipe.ND_SDR_headloss(FlowRate, HeadLoss, 200 * u.m,
+                                  1e-6 * u.m**2/u.s, 0.01 * u.mm, 2, 26)
+        self.assertEqual(ND.shape, (2, 2))
+        for i in range(2):
+            for j in range(2):
+                with self.subTest(i=i, j=j):
+                    self.assertEqual(ND[i, j],
+                                     pipe.ND_SDR_headloss(
+                                         FlowRate[i, j], HeadLoss[i, 0],
+                                         200 * u.m, 1e-6 * u.m**2/u.s,
+                                         0.01 * u.mm, 2, 26))
+
 if __name__ == '__main__':
     unittest.main()
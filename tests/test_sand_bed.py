@@ -0,0 +1,136 @@
+from aide_design.units import unit_registry as u
+from aide_design import expert_inputs as exp
+from aide_design import materials_database as mat
+from aide_design import physchem as pc
+from aide_design import sand_bed as sb
+import numpy as np
+import unittest
+
+
+class DiamSandFractionsTest(unittest.TestCase):
+    def test_distribution(self):
+        """The fractions should reproduce the effective size and d60."""
+        Diam = sb.diam_sand_fractions(NumFractions=10)
+        self.assertTrue(np.all(np.diff(Diam.magnitude) > 0))
+        # The 10% and 60% points fall between the fractions' midpoints.
+        self.assertTrue(Diam[0] < mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE < Diam[1])
+        self.assertTrue(Diam[5] < mat.DIAM_FILTER_SAND_60 < Diam[6])
+        self.assertRaises(ValueError, sb.diam_sand_fractions, 0.5 * u.mm, 1)
+
+
+class ExpansionSandBedTest(unittest.TestCase):
+    Depth = exp.N_FILTER_LAYER * exp.HEIGHT_FILTER_LAYER_MIN
+    Temp = u.Quantity(20, u.degC)
+
+    def test_backwash(self):
+        """The design backwash should expand the bed by about 30%."""
+        Porosity, RatioExpansion, HeadLoss = sb.expansion_sand_bed(
+            exp.VEL_FILTER_Bw_, self.Temp, self.Depth)
+        self.assertAlmostEqual(RatioExpansion.magnitude,
+                               mat.RATIO_FILTER_FLUIDIZED, delta=0.1)
+        # The fine sand expands the most and the coarsest stays fixed.
+        self.assertTrue(np.all(np.diff(Porosity.magnitude) <= 0))
+        self.assertEqual(Porosity[-1], mat.POROSITY_FILTER_SAND)
+
+    def test_fixed_bed(self):
+        """At low velocity the bed stays fixed with Kozeny head loss."""
+        Vel = 0.01 * u.mm/u.s
+        Porosity, RatioExpansion, HeadLoss = sb.expansion_sand_bed(
+            Vel, self.Temp, self.Depth, NumFractions=1)
+        self.assertEqual(RatioExpansion, 1)
+        Nu = pc.viscosity_kinematic(self.Temp)
+        Diam = sb.diam_sand_fractions(NumFractions=1)[0]
+        self.assertAlmostEqual(
+            HeadLoss.to(u.m).magnitude,
+            pc.headloss_kozeny(self.Depth, Diam, Vel, mat.POROSITY_FILTER_SAND,
+                               Nu).to(u.m).magnitude, places=6)
+
+    def test_fluidized_bed(self):
+        """A fully fluidized bed should carry the buoyant weight of its sand."""
+        Porosity, RatioExpansion, HeadLoss = sb.expansion_sand_bed(
+            40 * u.mm/u.s, self.Temp, self.Depth)
+        self.assertTrue(np.all(Porosity > mat.POROSITY_FILTER_SAND))
+        Buoyancy = (mat.RHO_FILTER_SAND / pc.density_water(self.Temp)) - 1
+        self.assertAlmostEqual(
+            HeadLoss.to(u.m).magnitude,
+            (self.Depth * (1 - mat.POROSITY_FILTER_SAND)
+             * Buoyancy).to(u.m).magnitude, places=9)
+
+    def test_sweep(self):
+        """Colder water and faster backwash should expand the bed more."""
+        Vel = np.linspace(2, 20, 10) * u.mm/u.s
+        Temp = (np.array([5, 15, 25]) + 273.15)[:, np.newaxis] * u.degK
+        Porosity, RatioExpansion, HeadLoss = sb.expansion_sand_bed(
+            Vel, Temp, self.Depth, NumFractions=30)
+        self.assertEqual(Porosity.shape, (3, 10, 30))
+        self.assertTrue(np.all(np.diff(RatioExpansion.magnitude, axis=1) >= 0))
+        self.assertTrue(np.all(np.diff(RatioExpansion.magnitude, axis=0) <= 0))
+
+    def test_washout(self):
+        Porosity, RatioExpansion, HeadLoss = sb.expansion_sand_bed(
+            1 * u.m/u.s, self.Temp, self.Depth)
+        self.assertEqual(Porosity[0], 1)
+        self.assertEqual(RatioExpansion.magnitude, np.inf)
+
+
+class FilterHeadlossStreamTest(unittest.TestCase):
+    """Test the filter clogging simulator."""
+    Temp = u.Quantity(20, u.degC)
+    Turbidity = 3 + np.sin(np.arange(20000) / 500)
+
+    def test_clean_bed(self):
+        """A clean filter should lose the Kozeny head loss of one layer."""
+        HeadLoss, Backwash = next(sb.filter_headloss_stream(
+            [[0]], 1 * u.min, self.Temp))
+        self.assertAlmostEqual(
+            HeadLoss[0].to(u.m).magnitude,
+            pc.headloss_kozeny(exp.HEIGHT_FILTER_LAYER_MIN,
+                               mat.DIAM_FILTER_SAND_EFFECTIVE_SIZE,
+                               exp.VEL_FILTER_LAYER, mat.POROSITY_FILTER_SAND,
+                               pc.viscosity_kinematic(self.Temp)
+                               ).to(u.m).magnitude, places=6)
+
+    def test_runs(self):
+        """Head loss should grow to dirty and fall again after a backwash."""
+        HeadLoss, Backwash = next(sb.filter_headloss_stream(
+            [self.Turbidity], 1 * u.min, self.Temp))
+        HeadLoss = HeadLoss.to(u.m).magnitude
+        Events = np.flatnonzero(Backwash)
+        self.assertGreater(len(Events), 2)
+        Dirty = exp.HEADLOSS_FILTER_DIRTY.to(u.m).magnitude
+        np.testing.assert_allclose(HeadLoss[Events], Dirty, rtol=1e-3)
+        self.assertTrue(np.all(HeadLoss[Events + 1] < HeadLoss[Events]))
+        self.assertTrue(np.all(HeadLoss[:Events[0]] < Dirty))
+        self.assertTrue(np.all(np.diff(HeadLoss[:Events[0] + 1]) >= 0))
+
+    def test_chunks(self):
+        """The chunk size should not change the result."""
+        whole = next(sb.filter_headloss_stream([self.Turbidity], 1 * u.min,
+                                               self.Temp))
+        chunks = list(sb.filter_headloss_stream(
+            (self.Turbidity[i:i + 777] for i in range(0, 20000, 777)),
+            1 * u.min, self.Temp))
+        np.testing.assert_allclose(
+            np.concatenate([c[0].magnitude for c in chunks]),
+            whole[0].magnitude, rtol=1e-12)
+        np.testing.assert_array_equal(
+            np.concatenate([c[1] for c in chunks]), whole[1])
+
+    def test_time_filter_dirty(self):
+        """Doubling the turbidity should halve the run of many filters."""
+        Coefficient = np.array([5, 10, 20]) / u.m
+        Time = sb.time_filter_dirty(
+            [np.column_stack((np.full(10000, 2), np.full(10000, 4)))
+             [:, :, np.newaxis]], 1 * u.min, self.Temp,
+            FilterCoefficient=Coefficient)
+        self.assertEqual(Time.shape, (2, 3))
+        np.testing.assert_allclose(Time[0].magnitude, 2 * Time[1].magnitude,
+                                   atol=120)
+        # Capturing the solids higher in the bed clogs it sooner.
+        self.assertTrue(np.all(np.diff(Time.magnitude, axis=1) < 0))
+        self.assertTrue(np.isnan(sb.time_filter_dirty(
+            [np.zeros(100)], 1 * u.min, self.Temp)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,68 @@
+from aide_design.units import unit_registry as u
+from aide_design import physchem as pc
+from aide_design import solvers as sv
+import numpy as np
+import unittest
+
+
+class BracketedRootTest(unittest.TestCase):
+    """Test the vectorized bracketed root finder."""
+    def test_roots(self):
+        target = np.array([2, 10, 1e-3, 0])
+        root, Iterations, converged = sv.bracketed_root(
+            lambda x, target: x**3 - target, 0, 5, (target,), RTol=1e-12)
+        np.testing.assert_allclose(root, np.cbrt(target), rtol=1e-11)
+        self.assertTrue(converged.all())
+        self.assertEqual(Iterations[3], 0)
+
+    def test_failures(self):
+        """Elements that are not bracketed or run out of iterations fail."""
+        root, Iterations, converged = sv.bracketed_root(
+            lambda x: x**2 - 2, np.array([0, 2, 0]), 5, MaxIter=3)
+        np.testing.assert_array_equal(converged, [False, False, False])
+        self.assertTrue(np.isnan(root).all())
+        np.testing.assert_array_equal(Iterations, [3, 0, 3])
+
+
+class SolveHeadlossTest(unittest.TestCase):
+    """The solutions should reproduce the given head loss."""
+    knownsRect = dict(FlowRate=20 * u.L/u.s, Width=0.4 * u.m,
+                      DistCenter=0.3 * u.m, Length=10 * u.m, KMinor=2,
+                      Nu=1e-6 * u.m**2/u.s, PipeRough=0.1 * u.mm,
+                      openchannel=True)
+
+    def test_solve_headloss_rect(self):
+        checks = (('FlowRate', 1e-6, 1), ('Width', 0.01, 1),
+                  ('DistCenter', 0.01, 1), ('Length', 1, 1e4),
+                  ('KMinor', 0, 1e3))
+        for name, Lower, Upper in checks:
+            with self.subTest(name=name):
+                knowns = dict(self.knownsRect)
+                knowns.pop(name)
+                value, Iterations, converged = sv.solve_headloss_rect(
+                    0.01 * u.m, name, Lower, Upper, **knowns)
+                self.assertTrue(converged)
+                knowns[name] = value
+                self.assertAlmostEqual(
+                    pc.headloss_rect(**knowns).to(u.m).magnitude, 0.01,
+                    places=9)
+
+    def test_solve_headloss_gen_array(self):
+        HeadLoss = np.array([0.01, 0.1, 1e6]) * u.m
+        Vel, Iterations, converged = sv.solve_headloss_gen(
+            HeadLoss, 'Vel', 1e-9, 20, Area=0.1, PerimWetted=1.2, Length=20,
+            KMinor=1, Nu=1e-6, PipeRough=1e-4)
+        np.testing.assert_array_equal(converged, [True, True, False])
+        np.testing.assert_allclose(
+            pc.headloss_gen(0.1, Vel[:2], 1.2, 20, 1, 1e-6, 1e-4).magnitude,
+            HeadLoss[:2].magnitude, rtol=1e-9)
+
+    def test_bad_unknown(self):
+        self.assertRaises(ValueError, sv.solve_headloss_rect, 0.01, 'openchannel',
+                          0, 1, **self.knownsRect)
+        self.assertRaises(TypeError, sv.solve_headloss_rect, 0.01, 'Width',
+                          0.01, 1, **self.knownsRect)
+
+
+if __name__ == '__main__':
+    unittest.main()
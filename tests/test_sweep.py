@@ -0,0 +1,98 @@
+from aide_design.units import unit_registry as u
+from aide_design import physchem as pc
+from aide_design import physchem_kernels as pk
+from aide_design import sweep as sw
+import numpy as np
+import json
+import os
+import tempfile
+import unittest
+
+
+class SweepTest(unittest.TestCase):
+    """Test the chunked, memory-mapped sweep."""
+    Axes = dict(FlowRate=np.linspace(1e-3, 0.1, 7), Diam=np.linspace(0.05, 0.5, 5),
+                Length=np.array([10, 100, 1000]))
+    Fixed = dict(Nu=1e-6, PipeRough=1e-4, KMinor=2)
+
+    def expected(self):
+        FlowRate, Diam, Length = np.meshgrid(*self.Axes.values(),
+                                             indexing='ij')
+        return pk.headloss(FlowRate, Diam, Length, **self.Fixed)
+
+    def test_sweep(self):
+        with tempfile.TemporaryDirectory() as path:
+            result, unit, axes = sw.sweep(pk.headloss, path, self.Axes,
+                                          self.Fixed, ChunkSize=16)
+            self.assertIsNone(unit)
+            np.testing.assert_array_equal(result, self.expected())
+            np.testing.assert_array_equal(axes['Diam'], self.Axes['Diam'])
+            del result
+
+    def test_units_float32(self):
+        Axes = dict(FlowRate=np.array([1, 10]) * u.L/u.s,
+                    Diam=np.array([5, 10, 20]) * u.cm)
+        with tempfile.TemporaryDirectory() as path:
+            result, unit, axes = sw.sweep(
+                pc.headloss_exp, path, Axes, dict(KMinor=2), ChunkSize=4,
+                dtype=np.float32)
+            self.assertEqual(result.dtype, np.float32)
+            self.assertEqual(u.Quantity(1, unit), 1 * u.m)
+            self.assertEqual(axes['FlowRate'].units, u.L/u.s)
+            expected = pc.headloss_exp(Axes['FlowRate'][:, np.newaxis],
+                                       Axes['Diam'], 2).to(u.m).magnitude
+            np.testing.assert_allclose(result, expected, rtol=1e-6)
+            del result
+
+    def test_resume(self):
+        """A sweep stopped part way finishes the remaining chunks only."""
+        calls = []
+        stop = [True]
+
+        def design(**kwargs):
+            if stop[0] and len(calls) == 2:
+                raise KeyboardInterrupt
+            calls.append(kwargs['FlowRate'].size)
+            return pk.headloss(**kwargs)
+
+        with tempfile.TemporaryDirectory() as path:
+            with self.assertRaises(KeyboardInterrupt):
+                sw.sweep(design, path, self.Axes, self.Fixed, ChunkSize=16)
+            with open(os.path.join(path, 'sweep.json')) as file:
+                self.assertEqual(json.load(file)['ChunksDone'], 2)
+            stop[0] = False
+            result, unit, axes = sw.sweep(design, path, self.Axes,
+                                          self.Fixed, ChunkSize=16)
+            # 105 points make 7 chunks, of which 2 were done.
+            self.assertEqual(calls, [16, 16, 16, 16, 16, 16, 9])
+            np.testing.assert_array_equal(result, self.expected())
+            del result
+            self.assertRaises(ValueError, sw.sweep, design, path,
+                              self.Axes, self.Fixed, ChunkSize=8)
+            self.assertRaises(ValueError, sw.sweep, pk.headloss, path,
+                              self.Axes, self.Fixed, ChunkSize=16)
+
+    def test_resume_changed_fixed(self):
+        """A sweep saved with other Fixed values is not resumed."""
+        Axes = dict(FlowRate=np.array([1, 10]) * u.L/u.s,
+                    Diam=np.array([5, 10, 20]) * u.cm)
+        with tempfile.TemporaryDirectory() as path:
+            sw.sweep(pc.headloss_exp, path, Axes, dict(KMinor=2),
+                     ChunkSize=4)
+            sw.sweep(pc.headloss_exp, path, Axes, dict(KMinor=2),
+                     ChunkSize=4)
+            self.assertRaises(ValueError, sw.sweep, pc.headloss_exp, path,
+                              Axes, dict(KMinor=3), ChunkSize=4)
+            self.assertRaises(ValueError, sw.sweep, pc.headloss_exp, path,
+                              Axes, dict(KMinor=2 * u.dimensionless),
+                              ChunkSize=4)
+            result, unit, axes = sw.sweep(pc.headloss_exp, path, Axes,
+                                          dict(KMinor=3), ChunkSize=4,
+                                          Resume=False)
+            expected = pc.headloss_exp(Axes['FlowRate'][:, np.newaxis],
+                                       Axes['Diam'], 3).to(u.m).magnitude
+            np.testing.assert_allclose(result, expected)
+            del result
+
+if __name__ == '__main__':
+    unittest.main()
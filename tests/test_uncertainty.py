@@ -0,0 +1,47 @@
+from aide_design.units import unit_registry as u
+from aide_design import materials_database as mat
+from aide_design import physchem_kernels as pk
+from aide_design import uncertainty as uc
+from aide_design import water_properties as wp
+import numpy as np
+import unittest
+
+
+class MonteCarloTest(unittest.TestCase):
+    """Test the Monte Carlo uncertainty engine."""
+    inputs = dict(FlowRate=10 * u.L/u.s, Diam=10 * u.cm, Length=100 * u.m,
+                  Nu=uc.uniform(15 * u.degC, 25 * u.degC,
+                                Transform=wp.viscosity_kinematic),
+                  PipeRough=uc.lognormal(mat.PIPE_ROUGH_PVC, 0.5),
+                  KMinor=uc.triangular(1, 2, 4))
+
+    def test_reproducible(self):
+        """The samples depend on the seed, not on the threads."""
+        percentiles, results = uc.monte_carlo(pk.headloss, 100000, Seed=7,
+                                              ChunkSize=10000, **self.inputs)
+        threaded = uc.monte_carlo('headloss', 100000, Seed=7,
+                                  ChunkSize=10000, Threads=4, **self.inputs)
+        np.testing.assert_array_equal(results, threaded[1])
+        np.testing.assert_array_equal(percentiles,
+                                      np.percentile(results, (5, 50, 95)))
+        self.assertFalse(np.array_equal(
+            results, uc.monte_carlo(pk.headloss, 100000, Seed=8,
+                                    **self.inputs)[1]))
+
+    def test_bounds(self):
+        """The head loss should lie between the extremes of the inputs."""
+        percentiles, results = uc.monte_carlo(pk.headloss, 10000, Seed=1,
+                                              **self.inputs)
+        fixed = (0.01, 0.1, 100)
+        low = pk.headloss(*fixed, wp.viscosity_kinematic(298.15), 0, 1)
+        high = pk.headloss(*fixed, wp.viscosity_kinematic(288.15), 0.01, 4)
+        self.assertTrue(np.all((results > low) & (results < high)))
+        self.assertTrue(percentiles[0] < percentiles[1] < percentiles[2])
+
+    def test_inputs(self):
+        self.assertRaises(TypeError, uc.monte_carlo, pk.headloss, 10,
+                          FlowRate=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+from aide_design.units import unit_registry as u
+from aide_design import water_hammer as wh
+from aide_design import physchem as pc
+from aide_design import pipedatabase as pipe
+import numpy as np
+import unittest
+
+
+class WaterHammerTest(unittest.TestCase):
+    """Test the method of characteristics transient solver."""
+    FlowRate = 3 * u.L/u.s
+    Length = 2 * u.km
+    args = (FlowRate, 4 * u.inch, 26, Length, 60 * u.m)
+    hydraulics = (1e-6 * u.m**2/u.s, 0.01 * u.mm)
+
+    def setUp(self):
+        self.Diam = pipe.ID_SDR(4 * u.inch, 26)
+        self.HeadValve = 60 * u.m - pc.headloss_fric(
+            self.FlowRate, self.Diam, self.Length, *self.hydraulics)
+        self.Surge = (wh.wave_speed_sdr(26) * self.FlowRate
+                      / (pc.area_circle(self.Diam) * u.gravity)).to(u.m)
+
+    def test_wave_speed(self):
+        self.assertGreater(wh.wave_speed_sdr(17), wh.wave_speed_sdr(26))
+        self.assertLess(wh.wave_speed_sdr(26), 1500 * u.m/u.s)
+
+    def test_joukowsky(self):
+        """Closing the valve at once should raise its head by a·V/g."""
+        Distance, HeadMax, HeadMin, HeadValve = wh.water_hammer(
+            *self.args, 0 * u.s, 60 * u.s, *self.hydraulics)
+        self.assertEqual(Distance[-1], self.Length)
+        self.assertAlmostEqual(HeadValve[0].to(u.m).magnitude,
+                               (self.HeadValve + self.Surge).to(u.m).magnitude,
+                               places=6)
+        self.assertGreaterEqual(HeadMax[-1], HeadValve[0])
+        # The reflected wave pulls the head at the valve down again.
+        self.assertLess(HeadMin[-1], self.HeadValve - self.Surge / 2)
+        # The reservoir holds its head.
+        self.assertEqual(HeadMax[0], 60 * u.m)
+        self.assertEqual(HeadMin[0], 60 * u.m)
+
+    def test_steady(self):
+        """A valve that stays open should keep the steady grade line."""
+        Distance, HeadMax, HeadMin, HeadValve = wh.water_hammer(
+            *self.args, 1e12 * u.s, 60 * u.s, *self.hydraulics)
+        np.testing.assert_allclose(HeadMax.magnitude, HeadMin.magnitude,
+                                   atol=1e-6)
+        self.assertAlmostEqual(HeadMax[-1].to(u.m).magnitude,
+                               self.HeadValve.to(u.m).magnitude, places=6)
+
+    def test_slow_closure(self):
+        """Closing over many wave periods should keep the surge small."""
+        Period = (2 * self.Length / wh.wave_speed_sdr(26)).to(u.s)
+        Distance, HeadMax, HeadMin, HeadValve = wh.water_hammer(
+            *self.args, 20 * Period, 30 * Period, *self.hydraulics)
+        self.assertLess(HeadMax[-1] - self.HeadValve, self.Surge / 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
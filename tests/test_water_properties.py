@@ -0,0 +1,43 @@
+from aide_design import water_properties as wp
+from aide_design import physchem as pc
+import numpy as np
+import unittest
+
+
+class WaterPropertiesTest(unittest.TestCase):
+    """Test the cached spline and the dense lookup tables."""
+    def test_density_matches_physchem(self):
+        """The cached spline should give the same values as physchem."""
+        checks = (273.15, 300, 343.15)
+        for i in checks:
+            with self.subTest(i=i):
+                self.assertEqual(wp.density_water(i),
+                                 pc.density_water(i).magnitude)
+
+    def test_array_input(self):
+        """The properties should accept temperature arrays of any shape."""
+        temp = np.linspace(275, 370, 12).reshape(3, 4)
+        self.assertEqual(wp.viscosity_kinematic(temp).shape, (3, 4))
+        self.assertEqual(wp.viscosity_kinematic_lookup(temp).shape, (3, 4))
+
+    def test_lookup_error_bound(self):
+        """The lookup tables should stay within their documented error."""
+        temp = np.linspace(wp.TEMP_TABLE_MIN, wp.TEMP_TABLE_MAX, 100003)
+        checks = ((wp.density_water_lookup, wp.density_water, 2.5e-10),
+                  (wp.viscosity_dynamic_lookup, wp.viscosity_dynamic, 1.9e-8),
+                  (wp.viscosity_kinematic_lookup, wp.viscosity_kinematic, 2e-8))
+        for lookup, exact, bound in checks:
+            with self.subTest(lookup=lookup.__name__):
+                error = np.abs(lookup(temp) / exact(temp) - 1)
+                self.assertLess(error.max(), bound)
+
+    def test_lookup_outside_table(self):
+        """Temperatures outside the table should use the exact function."""
+        temp = np.array([260, 300, 380])
+        np.testing.assert_allclose(wp.density_water_lookup(temp),
+                                   wp.density_water(temp), rtol=1e-9)
+        self.assertEqual(wp.density_water_lookup(380), wp.density_water(380))
+
+
+if __name__ == '__main__':
+    unittest.main()